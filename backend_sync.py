@@ -34,6 +34,7 @@ from fgis_clickhouse.mit_sync import (
     build_mit_row,
     detect_country,
     insert_mit_registry,
+    normalize_mit_details,
     sync_mit_registry,
 )
 from fgis_clickhouse.pipeline import (
@@ -49,7 +50,10 @@ from fgis_clickhouse.pipeline import (
 from fgis_clickhouse.runtime import (
     DAILY_MONTH_DAYS,
     DAILY_MONTH_EVERY,
+    DEFAULT_MIT_DETAILS_WORKERS,
+    DEFAULT_MIT_STOP_EXISTING_RATIO,
     DEFAULT_START_DATE,
+    DEFAULT_VRI_DAY_WORKERS,
     DEFAULT_VRI_MIN_ROWS,
     DEFAULT_VRI_ROWS,
     DEFAULT_VRI_SLEEP,
@@ -64,30 +68,40 @@ from fgis_clickhouse.runtime import (
     PROD_SYNC_HOUR,
     WEEKLY_3M_DAYS,
     WEEKLY_3M_EVERY,
+    SyncConfig,
     acquire_process_lock,
     env_pick,
+    load_state,
+    reset_state_cache,
     should_run,
     should_run_any,
     state_get,
     state_get_any,
     state_set,
+    state_set_many,
 )
 from fgis_clickhouse.vri_sync import (
+    build_vri_columns,
     build_vri_row,
+    dedupe_vri_day_in_place,
     delete_vri_day,
     fq_for_day,
     fq_for_range,
     insert_verifications,
     iter_vri_pages,
+    local_vri_counts_grouped,
+    local_vri_counts_grouped_many,
     local_vri_counts_range,
     local_vri_stats,
     pick_start_date,
     reconcile_day_with_remote,
     reconcile_day_with_test,
+    reconcile_days_with_remote,
     reconcile_prod_by_year_month,
     reconcile_remote_by_year_month,
     reload_vri_day_from_remote,
     remote_vri_count,
+    remote_vri_day_counts,
     replace_vri_day_from_test,
     resolve_vri_start_date,
     sync_vri_day,
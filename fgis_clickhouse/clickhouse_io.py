@@ -2,12 +2,64 @@
 
 from __future__ import annotations
 
+import copy
 import os
+import random
+import threading
 import time
-from datetime import date
-from typing import Any, Optional, Sequence, Set
+from typing import Any, Callable, Optional, Sequence, Set, Union
 
-from .utils import chunked
+from .utils import chunked, chunked_columns
+
+DEFAULT_INSERT_BATCH = 65536
+# Server errors worth retrying an insert for: socket timeout, network error
+# and "too many parts" back-pressure.
+RETRYABLE_INSERT_CODES = frozenset({209, 210, 252})
+# Caps concurrent reconnects so failing workers do not storm the server.
+_RECONNECT_GATE = threading.BoundedSemaphore(2)
+# Highly repeated text columns are dictionary-encoded on disk and on the wire.
+MIT_LOW_CARDINALITY_COLUMNS = ("country", "mit_title", "notation")
+
+
+def _compression_setting() -> Union[str, bool]:
+    """Pick native-protocol block compression from CH_COMPRESSION.
+
+    Unset means lz4 when the driver's optional codec packages are installed
+    (`clickhouse-driver[lz4]`); `0`/`off` disables it, other values name the
+    codec.
+    """
+    value = os.getenv("CH_COMPRESSION")
+    if value is not None:
+        value = value.strip().lower()
+        return False if value in ("", "0", "false", "no", "off") else value
+    try:
+        import clickhouse_cityhash  # noqa: F401
+        import lz4  # noqa: F401
+    except ModuleNotFoundError:
+        return False
+    return "lz4"
+
+
+class _SharedClient:
+    """Native client shared by the `CH` handles of one session.
+
+    `reconnect()` swaps the client here, so every handle from
+    `CH.with_database()` moves to the new session together.
+    """
+
+    def __init__(self, connect: Callable[[], Any]) -> None:
+        self._connect = connect
+        self.client = connect()
+
+    def disconnect(self) -> None:
+        try:
+            self.client.disconnect()
+        except Exception:
+            pass
+
+    def reconnect(self) -> None:
+        self.disconnect()
+        self.client = self._connect()
 
 
 class CH:
@@ -18,106 +70,171 @@ class CH:
 
         self._params = dict(host=host, port=port, user=user, password=password, database=database)
         self.db = database
-        self.batch_size = int(os.getenv("CH_INSERT_BATCH", "500"))
+        # MergeTree prefers few large parts; sync jobs buffer pages up to this
+        # many rows, so a typical VRI day or MIT run is one or two blocks.
+        self.batch_size = max(1, int(os.getenv("CH_INSERT_BATCH", str(DEFAULT_INSERT_BATCH))))
         self.retries = int(os.getenv("CH_INSERT_RETRIES", "3"))
         self._settings = {"send_retries": 2, "retry_timeout": 5}
+        # CH_ASYNC_INSERT=1 lets the server coalesce small day blocks into
+        # fewer parts. The client still waits for the flush, because
+        # reconcile counts rows right after a load.
+        self._insert_settings: Optional[dict[str, Any]] = None
+        if os.getenv("CH_ASYNC_INSERT", "0").strip().lower() in ("1", "true", "yes", "on"):
+            self._insert_settings = {"async_insert": 1, "wait_for_async_insert": 1}
+        self._compression = _compression_setting()
         self._Native = Native
-        self._connect()
+        self._idle: list[CH] = []
+        self._idle_lock = threading.Lock()
+        self._shared = _SharedClient(self._connect)
+        self._owns_client = True
+
+    def _connect(self) -> Any:
+        # Pooled worker connections can sit idle between phases of a run;
+        # keepalive stops middleboxes from silently dropping them.
+        return self._Native(
+            **self._params,
+            compression=self._compression,
+            tcp_keepalive=True,
+            settings=self._settings,
+        )
+
+    @property
+    def _client(self) -> Any:
+        return self._shared.client
+
+    def with_database(self, database: str) -> "CH":
+        """Return a handle for another database on the same TCP session.
 
-    def _connect(self) -> None:
-        self._client = self._Native(**self._params, compression=False, settings=self._settings)
+        All queries qualify table names with `db`, so handles for test, prod
+        and DDL can share one native connection. A reconnect through any
+        handle moves all of them; only the handle that opened the session
+        disconnects it on `close()`. Worker connections from `acquire()` are
+        still separate and open with `database` as default.
+        """
+        view = copy.copy(self)
+        view.db = database
+        view._params = {**self._params, "database": database}
+        view._idle = []
+        view._idle_lock = threading.Lock()
+        view._owns_client = False
+        return view
+
+    def clone(self) -> "CH":
+        """Open a separate connection with the same settings for another thread."""
+        return CH(**self._params)
+
+    def acquire(self) -> "CH":
+        """Borrow a warm connection for a worker thread, opening one if needed.
+
+        Worker connections are kept after `release()`, so repeated parallel
+        phases of one run reuse the same TCP sessions.
+        """
+        with self._idle_lock:
+            if self._idle:
+                return self._idle.pop()
+        return self.clone()
+
+    def release(self, conn: "CH") -> None:
+        with self._idle_lock:
+            self._idle.append(conn)
+
+    def close(self) -> None:
+        with self._idle_lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
+        if self._owns_client:
+            self._shared.disconnect()
 
     def reconnect(self) -> None:
-        try:
-            self._client.disconnect()
-        except Exception:
-            pass
-        self._connect()
+        self._shared.reconnect()
 
     def exec(self, sql: str, params: Optional[dict] = None) -> Any:
         if params is None:
             return self._client.execute(sql)
         return self._client.execute(sql, params)
 
-    def scalar(self, sql: str) -> Any:
-        rows = self._client.execute(sql)
+    def insert_select(self, sql: str, params: Optional[dict] = None) -> Optional[int]:
+        """Run a server-side INSERT ... SELECT and return the rows it wrote.
+
+        The count comes from the query progress packets, so callers do not
+        need a second scan of the source to know what was copied. Returns None
+        when it is unknown: the driver starts `written_rows` at 0, so a 0 also
+        means the server sent no write progress.
+        """
+        self.exec(sql, params)
+        progress = getattr(getattr(self._client, "last_query", None), "progress", None)
+        written = getattr(progress, "written_rows", None)
+        return int(written) if written else None
+
+    def scalar(self, sql: str, params: Optional[dict] = None) -> Any:
+        rows = self.exec(sql, params)
         return rows[0][0] if rows else None
 
-    def rows(self, sql: str):
-        return self._client.execute(sql)
+    def rows(self, sql: str, params: Optional[dict] = None):
+        return self.exec(sql, params)
 
-    def insert(self, table: str, columns: Sequence[str], rows_data) -> None:
+    def insert(self, table: str, columns: Sequence[str], rows_data, *, columnar: bool = False) -> None:
+        """Insert row tuples, or one sequence per column when `columnar=True`.
+
+        The native protocol ships blocks column by column, so columnar input
+        skips the driver-side transpose of every row tuple.
+        """
         if not rows_data:
             return
         cols = ",".join(columns)
-        from clickhouse_driver.errors import NetworkError, SocketTimeoutError
+        from clickhouse_driver.errors import NetworkError, ServerException, SocketTimeoutError
 
-        for chunk in chunked(rows_data, self.batch_size):
+        if columnar:
+            if not rows_data[0]:
+                return
+            chunks = chunked_columns(rows_data, self.batch_size)
+        else:
+            chunks = chunked(rows_data, self.batch_size)
+        for chunk in chunks:
             attempt = 0
             while True:
                 try:
-                    self._client.execute(f"INSERT INTO {self.db}.{table} ({cols}) VALUES", chunk)
+                    self._client.execute(
+                        f"INSERT INTO {self.db}.{table} ({cols}) VALUES",
+                        chunk,
+                        columnar=columnar,
+                        settings=self._insert_settings,
+                    )
                     break
-                except (NetworkError, SocketTimeoutError):
+                except (NetworkError, SocketTimeoutError, ServerException) as exc:
                     attempt += 1
-                    if attempt <= self.retries:
-                        time.sleep(1.5 * attempt)
+                    if isinstance(exc, ServerException) and exc.code not in RETRYABLE_INSERT_CODES:
+                        raise
+                    if attempt > self.retries:
+                        raise
+                    # Full jitter spreads writers that failed together.
+                    time.sleep(random.uniform(0, min(60.0, 0.5 * 2**attempt)))
+                    with _RECONNECT_GATE:
                         self.reconnect()
-                        continue
-                    raise
-
-    def existing_ids(self, table: str, idcol: str, ids) -> Set[str]:
-        values = [value for value in ids if value]
-        if not values:
-            return set()
-        existing: Set[str] = set()
-        for group in chunked(values, 1000):
-            rows = self._client.execute(
-                f"SELECT {idcol} FROM {self.db}.{table} WHERE {idcol} IN %(ids)s",
-                {"ids": tuple(group)},
-            )
-            existing.update(row[0] for row in rows)
-        return existing
-
-    def existing_ids_for_date(
-        self,
-        table: str,
-        idcol: str,
-        ids,
-        *,
-        date_col: str,
-        day: date,
-    ) -> Set[str]:
-        values = [value for value in ids if value]
-        if not values:
-            return set()
-        existing: Set[str] = set()
-        day_str = day.strftime("%Y-%m-%d")
-        for group in chunked(values, 1000):
-            rows = self._client.execute(
-                f"SELECT {idcol} FROM {self.db}.{table} "
-                f"WHERE {date_col} = toDate(%(day)s) AND {idcol} IN %(ids)s",
-                {"ids": tuple(group), "day": day_str},
-            )
-            existing.update(row[0] for row in rows)
-        return existing
+
+    def distinct_values(self, table: str, column: str, where: str = "", params: Optional[dict] = None) -> Set[Any]:
+        """Load the distinct values of one column, e.g. to filter pages locally."""
+        sql = f"SELECT DISTINCT {column} FROM {self.db}.{table}"
+        if where:
+            sql += f" WHERE {where}"
+        return {row[0] for row in self.exec(sql, params)}
 
 
 def ensure_tables(ch: CH, db: Optional[str] = None) -> None:
     """Create the ClickHouse schema required for ingestion jobs."""
     db = db or ch.db
-    ddl_statements = [
-        f"CREATE DATABASE IF NOT EXISTS {db}",
-        f"""
+    table_ddl = {
+        "mit_registry": f"""
         CREATE TABLE IF NOT EXISTS {db}.mit_registry (
-            country String,
+            country LowCardinality(String),
             inserted_at DateTime DEFAULT now(),
             is_actual UInt8,
             manufacturer String,
             mit_number String,
-            mit_title String,
+            mit_title LowCardinality(String),
             mpi String,
-            notation String,
+            notation LowCardinality(String),
             j_modification String,
             order_date Nullable(Date),
             order_num String,
@@ -126,15 +243,15 @@ def ensure_tables(ch: CH, db: Optional[str] = None) -> None:
         ) ENGINE = ReplacingMergeTree(inserted_at)
         ORDER BY mit_number
         """,
-        f"""
+        "verifications": f"""
         CREATE TABLE IF NOT EXISTS {db}.verifications (
             applicability UInt8,
             inserted_at DateTime DEFAULT now(),
             mi_modification String,
             mi_number String,
-            mit_notation String,
+            mit_notation LowCardinality(String),
             mit_number String,
-            mit_title String,
+            mit_title LowCardinality(String),
             org_title LowCardinality(String),
             valid_date Nullable(Date),
             verification_date Date,
@@ -143,7 +260,7 @@ def ensure_tables(ch: CH, db: Optional[str] = None) -> None:
         PARTITION BY toYYYYMM(verification_date)
         ORDER BY (verification_date, vri_id)
         """,
-        f"""
+        "sync_state": f"""
         CREATE TABLE IF NOT EXISTS {db}.sync_state (
             key String,
             last_run DateTime,
@@ -152,9 +269,30 @@ def ensure_tables(ch: CH, db: Optional[str] = None) -> None:
         ) ENGINE = ReplacingMergeTree(ver)
         ORDER BY key
         """,
-    ]
+    }
 
-    for ddl in ddl_statements:
-        ch.exec(ddl)
+    # Every run starts here; an existing schema costs one catalog read
+    # instead of a DDL round trip per table.
+    existing = {row[0] for row in ch.rows("SELECT name FROM system.tables WHERE database = %(db)s", {"db": db})}
+    if not existing:
+        ch.exec(f"CREATE DATABASE IF NOT EXISTS {db}")
+    for table, ddl in table_ddl.items():
+        if table not in existing:
+            ch.exec(ddl)
+
+    # MIT is small, so older deployments are migrated in place. Existing
+    # verifications tables are left alone: rewriting them is an operator
+    # decision, and String/LowCardinality columns copy between test and prod.
+    if "mit_registry" in existing:
+        column_types = dict(
+            ch.rows(
+                "SELECT name, type FROM system.columns "
+                "WHERE database = %(db)s AND table = 'mit_registry' AND name IN %(columns)s",
+                {"db": db, "columns": MIT_LOW_CARDINALITY_COLUMNS},
+            )
+        )
+        for column in MIT_LOW_CARDINALITY_COLUMNS:
+            if column_types.get(column) == "String":
+                ch.exec(f"ALTER TABLE {db}.mit_registry MODIFY COLUMN {column} LowCardinality(String)")
 
     # Minimal schema only: no analytics views here.
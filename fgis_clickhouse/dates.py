@@ -3,17 +3,84 @@
 from __future__ import annotations
 
 from datetime import date, datetime, timedelta
+from functools import lru_cache
 from typing import Any, Iterable, Optional
 
 
+def _iso_date(text: str) -> Optional[date]:
+    """Build a date from `YYYY-MM-DD` without the strptime format machinery."""
+    if (
+        len(text) == 10
+        and text[4] == "-"
+        and text[7] == "-"
+        and text[:4].isdigit()
+        and text[5:7].isdigit()
+        and text[8:].isdigit()
+    ):
+        try:
+            return date(int(text[:4]), int(text[5:7]), int(text[8:10]))
+        except ValueError:
+            return None
+    return None
+
+
+@lru_cache(maxsize=8192)
 def parse_ymd(raw: str) -> Optional[date]:
     """Parse an ISO calendar date from env/config text."""
+    parsed = _iso_date(raw)
+    if parsed is not None:
+        return parsed
     try:
         return datetime.strptime(raw, "%Y-%m-%d").date()
     except Exception:
         return None
 
 
+def _dotted_date(text: str) -> Optional[date]:
+    """Build a date from `DD.MM.YYYY` without the strptime format machinery."""
+    if (
+        len(text) == 10
+        and text[2] == "."
+        and text[5] == "."
+        and text[:2].isdigit()
+        and text[3:5].isdigit()
+        and text[6:].isdigit()
+    ):
+        try:
+            return date(int(text[6:]), int(text[3:5]), int(text[:2]))
+        except ValueError:
+            return None
+    return None
+
+
+@lru_cache(maxsize=8192)
+def _parse_date_text(text: str) -> Optional[date]:
+    """Parse FGIS date text; cached because a VRI day repeats the same values."""
+    # Fixed shapes from FGIS/Solr are sliced directly; anything else takes the
+    # general normalize-and-strptime path below.
+    if len(text) >= 10 and text[4] == "-" and text[7] == "-" and (len(text) == 10 or text[10] == "T"):
+        parsed = _iso_date(text[:10])
+        if parsed is not None:
+            return parsed
+    parsed = _dotted_date(text)
+    if parsed is not None:
+        return parsed
+    cut = text.find("T")
+    if cut >= 0:
+        text = text[:cut]
+    if "Z" in text:
+        text = text.replace("Z", "")
+    parsed = _iso_date(text)
+    if parsed is not None:
+        return parsed
+    for fmt in ("%Y-%m-%d", "%d.%m.%Y"):
+        try:
+            return datetime.strptime(text, fmt).date()
+        except Exception:
+            continue
+    return None
+
+
 def parse_date_any(raw: Any) -> Optional[date]:
     """Parse the date formats returned by FGIS and ClickHouse drivers."""
     if not raw:
@@ -25,15 +92,7 @@ def parse_date_any(raw: Any) -> Optional[date]:
     text = str(raw).strip()
     if not text:
         return None
-    text = text.replace("Z", "")
-    if "T" in text:
-        text = text.split("T")[0]
-    for fmt in ("%Y-%m-%d", "%d.%m.%Y"):
-        try:
-            return datetime.strptime(text, fmt).date()
-        except Exception:
-            continue
-    return None
+    return _parse_date_text(text)
 
 
 def iter_month_starts(start: date, end: date) -> Iterable[date]:
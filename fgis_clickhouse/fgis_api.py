@@ -147,6 +147,32 @@ class FGISClient:
         response = payload.get("response") or {}
         return int(response.get("numFound", 0))
 
+    def vri_day_counts(self, start_iso: str, end_iso: str) -> Dict[str, int]:
+        """Return per-day VRI counts for a date range from one range facet.
+
+        Keys are the facet bucket starts (`YYYY-MM-DDT00:00:00Z`). Raises when
+        the endpoint answers without the facet, so callers can fall back to
+        per-day counts.
+        """
+        params = [
+            "q=*",
+            "rows=0",
+            "facet=true",
+            "facet.range=verification_date",
+            "facet.range.start=" + request_utils.quote(f"{start_iso}T00:00:00Z", safe=":"),
+            "facet.range.end=" + request_utils.quote(f"{end_iso}T00:00:00Z+1DAY", safe=":"),
+            "facet.range.gap=" + request_utils.quote("+1DAY", safe=""),
+        ]
+        url = VRI_SEARCH_BASE + "?" + "&".join(params)
+        payload = self._http.json(url)
+        ranges = (payload.get("facet_counts") or {}).get("facet_ranges") or {}
+        buckets = (ranges.get("verification_date") or {}).get("counts")
+        if buckets is None:
+            raise ValueError("FGIS response has no verification_date range facet")
+        if isinstance(buckets, dict):
+            return {key: int(value) for key, value in buckets.items()}
+        return {buckets[idx]: int(buckets[idx + 1]) for idx in range(0, len(buckets) - 1, 2)}
+
     def vri_page(
         self,
         *,
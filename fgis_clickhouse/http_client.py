@@ -4,6 +4,7 @@ from __future__ import annotations
 
 import os
 import random
+import threading
 import time
 from dataclasses import dataclass
 from datetime import datetime, timezone
@@ -12,6 +13,11 @@ from typing import Any, Dict, Optional
 
 import requests
 
+try:
+    import orjson
+except ModuleNotFoundError:  # Optional speedup; response.json() gives the same values.
+    orjson = None
+
 UA_POOL = [
     "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/126 Safari/537.36",
     "Mozilla/5.0 (Macintosh; Intel Mac OS X 14_5) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.5 Safari/605.1.15",
@@ -23,13 +29,79 @@ MIN_RPS = 0.05
 RETRY_STATUSES = {429, 500, 502, 503, 504}
 
 
+# requests keeps up to this many idle connections per host by default.
+DEFAULT_HTTP_POOL_SIZE = 10
+SESSION_HEADERS = {
+    "Accept": "application/json, text/plain, */*",
+    "Connection": "keep-alive",
+    "Referer": "https://fgis.gost.ru/fundmetrology/",
+}
+
+
 def _headers() -> Dict[str, str]:
-    """Return a randomized header set that mimics a browser."""
-    return {
-        "User-Agent": random.choice(UA_POOL),
-        "Accept": "application/json, text/plain, */*",
-        "Referer": "https://fgis.gost.ru/fundmetrology/",
-    }
+    """Return the per-request headers; the static ones live on the session."""
+    return {"User-Agent": random.choice(UA_POOL)}
+
+
+class TokenBucket:
+    """Thread-safe token bucket: `rate` tokens per second, up to `capacity`.
+
+    With capacity 1 this is a plain minimum interval between request starts;
+    larger capacities let idle time be spent as a short burst while the mean
+    rate stays at `rate`.
+    """
+
+    def __init__(self, rate: float, capacity: float = 1.0) -> None:
+        self.rate = rate
+        self.capacity = max(1.0, capacity)
+        self._tokens = self.capacity
+        self._updated_at: Optional[float] = None
+        self._resume_at = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """Block until one token is available, then take it.
+
+        The token is reserved under the lock and the wait happens outside it,
+        so `defer()` is never held up by a sleeping caller. A caller whose wait
+        overlapped a new `defer()` waits again for the later resume time.
+        """
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                if self._updated_at is None:
+                    self._updated_at = now
+                elif now > self._updated_at:
+                    self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+                    self._updated_at = now
+                # `_updated_at` may lie ahead: reserved tokens or a Retry-After pause.
+                self._tokens -= 1.0
+                wait = self._updated_at - now
+                if self._tokens < 0.0:
+                    wait += -self._tokens / self.rate
+                    self._updated_at += -self._tokens / self.rate
+                    self._tokens = 0.0
+                resume_at = self._resume_at
+            if wait > 0:
+                time.sleep(wait)
+            if self._resume_at == resume_at:
+                return
+
+    def defer(self, seconds: float) -> None:
+        """Hold every caller for `seconds`, then resume with a single token.
+
+        A Retry-After answer means the server wants all requests to pause, not
+        only the one that received it; other threads sharing the bucket wait
+        too instead of collecting their own 429s. Overlapping pauses do not add
+        up: the later resume time wins.
+        """
+        with self._lock:
+            resume_at = time.monotonic() + seconds
+            if resume_at > self._resume_at:
+                self._resume_at = resume_at
+            if self._updated_at is None or self._resume_at > self._updated_at:
+                self._tokens = 1.0
+                self._updated_at = self._resume_at
 
 
 @dataclass
@@ -42,9 +114,19 @@ class HttpClient:
 
     def __post_init__(self) -> None:
         self._session = requests.Session()
+        self._session.headers.update(SESSION_HEADERS)
+        # Day and detail worker pools share this session; a pool smaller than
+        # the worker count would drop and reopen TLS connections.
+        pool_size = int(os.getenv("HTTP_POOL_SIZE", str(DEFAULT_HTTP_POOL_SIZE)))
+        if pool_size > DEFAULT_HTTP_POOL_SIZE:
+            adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+            self._session.mount("https://", adapter)
         self._rps = max(self.rps, MIN_RPS)
-        self._min_interval = 1.0 / self._rps
-        self._next_request_at = 0.0
+        try:
+            burst = float(os.getenv("HTTP_BURST", "1"))
+        except ValueError:
+            burst = 1.0
+        self._bucket = TokenBucket(self._rps, burst)
         self._proxies = {"http": self.proxy, "https": self.proxy} if self.proxy else None
         try:
             self.timeout = max(1, int(os.getenv("HTTP_TIMEOUT", str(self.timeout))))
@@ -55,12 +137,12 @@ class HttpClient:
         self._max_sleep = float(os.getenv("HTTP_MAX_SLEEP", "120.0"))
 
     def _wait_for_slot(self) -> None:
-        """Ensure request start rate does not exceed the configured RPS."""
-        now = time.monotonic()
-        if self._next_request_at > now:
-            time.sleep(self._next_request_at - now)
-        started_at = time.monotonic()
-        self._next_request_at = started_at + self._min_interval
+        """Ensure request start rate does not exceed the configured RPS.
+
+        The bucket is shared by every thread using this client, so worker
+        pools never multiply the FGIS request rate.
+        """
+        self._bucket.acquire()
 
     def _retry_after_seconds(self, header_value: Optional[str]) -> Optional[float]:
         """Parse Retry-After as either delay seconds or an HTTP date."""
@@ -98,11 +180,17 @@ class HttpClient:
             try:
                 response = self._session.get(url, headers=_headers(), timeout=self.timeout, proxies=self._proxies)
                 if response.status_code == 200:
-                    return response.json()
+                    # Solr pages are large; orjson decodes them several times faster.
+                    return orjson.loads(response.content) if orjson is not None else response.json()
                 if response.status_code in RETRY_STATUSES:
                     last_detail = f"HTTP {response.status_code}"
-                    if attempt + 1 < self._max_retries:
-                        sleep_s = self._retry_sleep_seconds(attempt, response.headers.get("Retry-After"))
+                    retry_after = response.headers.get("Retry-After")
+                    retry_after_s = self._retry_after_seconds(retry_after)
+                    if retry_after_s:
+                        # The next _wait_for_slot() sits out the pause with every other thread.
+                        self._bucket.defer(retry_after_s)
+                    elif attempt + 1 < self._max_retries:
+                        sleep_s = self._retry_sleep_seconds(attempt, retry_after)
                         time.sleep(sleep_s)
                     continue
                 response.raise_for_status()
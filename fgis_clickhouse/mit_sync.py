@@ -4,101 +4,158 @@ from __future__ import annotations
 
 import json
 import logging
+import re
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import date, datetime
-from typing import Any, Optional
+from functools import lru_cache
+from typing import Any, Iterator, Optional
 
 from .clickhouse_io import CH
 from .dates import parse_date_any
 from .fgis_api import FGISClient
+from .runtime import DEFAULT_MIT_DETAILS_WORKERS, DEFAULT_MIT_STOP_EXISTING_RATIO
+
+try:
+    import orjson
+except ModuleNotFoundError:  # Optional speedup; stdlib json gives the same values.
+    orjson = None
 
 
 log = logging.getLogger("fgis_backend")
 
-def _json_loads_maybe(value: Any) -> Any:
-    if value is None:
-        return None
-    if isinstance(value, (list, dict)):
+_json_loads = orjson.loads if orjson is not None else json.loads
+
+def _coerce_json(value: Any) -> Any:
+    """Return decoded JSON for FGIS fields that may arrive as objects or text."""
+    # Exact type checks first: details payloads usually carry real lists/dicts.
+    value_type = type(value)
+    if value_type is dict or value_type is list:
         return value
-    if isinstance(value, str):
+    if value_type is str:
         text = value.strip()
         if not text:
             return None
         try:
-            return json.loads(text)
+            return _json_loads(text)
         except Exception:
             return None
+    if isinstance(value, (list, dict)):
+        return value
     return None
 
 def _extract_text(value: Any, keys: tuple[str, ...]) -> str:
-    if value is None:
-        return ""
-    if isinstance(value, str):
-        return value.strip()
-    if isinstance(value, dict):
-        for key in keys:
-            val = value.get(key)
-            if val:
-                return str(val).strip()
-        for val in value.values():
-            if isinstance(val, str) and val.strip():
-                return val.strip()
-        return ""
-    if isinstance(value, list):
-        for item in value:
-            text = _extract_text(item, keys)
+    """Return the first non-empty text found depth-first in a JSON value."""
+    # An explicit stack keeps nested list payloads off the Python call stack;
+    # items are pushed reversed so they are visited in document order.
+    stack = [value]
+    while stack:
+        value = stack.pop()
+        if isinstance(value, str):
+            text = value.strip()
             if text:
                 return text
+        elif isinstance(value, dict):
+            # The first present key decides for this dict; a blank value
+            # moves the walk on to the next item, not to the other keys.
+            text = ""
+            for key in keys:
+                val = value.get(key)
+                if val:
+                    text = str(val).strip()
+                    break
+            else:
+                for val in value.values():
+                    if isinstance(val, str) and val.strip():
+                        text = val.strip()
+                        break
+            if text:
+                return text
+        elif isinstance(value, list):
+            stack.extend(reversed(value))
     return ""
 
+COUNTRY_RULES = (
+    ("РОССИЯ", "Россия"),
+    ("RUSSIA", "Россия"),
+    ("БЕЛАРУС", "Беларусь"),
+    ("BELARUS", "Беларусь"),
+    ("КАЗАХСТАН", "Казахстан"),
+    ("KAZAKH", "Казахстан"),
+    ("КИТАЙ", "Китай"),
+    ("CHINA", "Китай"),
+    ("США", "США"),
+    ("USA", "США"),
+    ("UNITED STATES", "США"),
+    ("ГЕРМАН", "Германия"),
+    ("GERMANY", "Германия"),
+    ("GMBH", "Германия"),
+    ("ЯПОНИ", "Япония"),
+    ("JAPAN", "Япония"),
+    ("ВЕЛИКОБРИТАН", "Великобритания"),
+    ("UNITED KINGDOM", "Великобритания"),
+    (" UK", "Великобритания"),
+    ("ФРАНЦ", "Франция"),
+    ("FRANCE", "Франция"),
+    ("ИТАЛ", "Италия"),
+    ("ITALY", "Италия"),
+    ("ТАЙВАН", "Тайвань"),
+    ("TAIWAN", "Тайвань"),
+    ("КОРЕЯ", "Корея"),
+    ("KOREA", "Корея"),
+    ("МАЛАЙЗ", "Малайзия"),
+    ("MALAYSIA", "Малайзия"),
+    ("ШВЕЙЦАР", "Швейцария"),
+    ("SWITZERLAND", "Швейцария"),
+)
+MIT_COLUMNS = [
+    "country",
+    "inserted_at",
+    "is_actual",
+    "manufacturer",
+    "mit_number",
+    "mit_title",
+    "mpi",
+    "notation",
+    "j_modification",
+    "order_date",
+    "order_num",
+    "production_type",
+    "valid_to",
+]
+# One multi-pattern scan replaces a substring search per rule. Each rule is its
+# own capture group, so `lastindex` is the rule index; the lookahead reports a
+# match at every position and the lowest index wins, exactly like checking
+# COUNTRY_RULES one by one.
+_COUNTRY_RE = re.compile("(?=(?:" + "|".join(f"({re.escape(needle)})" for needle, _country in COUNTRY_RULES) + "))")
+
+@lru_cache(maxsize=4096)
+def _detect_country_text(text: str) -> str:
+    s = text.upper()
+    best = len(COUNTRY_RULES)
+    for match in _COUNTRY_RE.finditer(s):
+        idx = match.lastindex - 1
+        if idx < best:
+            best = idx
+            if idx == 0:
+                break
+    if best == len(COUNTRY_RULES):
+        return "Прочие"
+    return COUNTRY_RULES[best][1]
+
 def detect_country(manuf_str: str) -> str:
     if not manuf_str:
         return "Не указано"
-    s = str(manuf_str).upper()
-    rules = [
-        ("РОССИЯ", "Россия"),
-        ("RUSSIA", "Россия"),
-        ("БЕЛАРУС", "Беларусь"),
-        ("BELARUS", "Беларусь"),
-        ("КАЗАХСТАН", "Казахстан"),
-        ("KAZAKH", "Казахстан"),
-        ("КИТАЙ", "Китай"),
-        ("CHINA", "Китай"),
-        ("США", "США"),
-        ("USA", "США"),
-        ("UNITED STATES", "США"),
-        ("ГЕРМАН", "Германия"),
-        ("GERMANY", "Германия"),
-        ("GMBH", "Германия"),
-        ("ЯПОНИ", "Япония"),
-        ("JAPAN", "Япония"),
-        ("ВЕЛИКОБРИТАН", "Великобритания"),
-        ("UNITED KINGDOM", "Великобритания"),
-        (" UK", "Великобритания"),
-        ("ФРАНЦ", "Франция"),
-        ("FRANCE", "Франция"),
-        ("ИТАЛ", "Италия"),
-        ("ITALY", "Италия"),
-        ("ТАЙВАН", "Тайвань"),
-        ("TAIWAN", "Тайвань"),
-        ("КОРЕЯ", "Корея"),
-        ("KOREA", "Корея"),
-        ("МАЛАЙЗ", "Малайзия"),
-        ("MALAYSIA", "Малайзия"),
-        ("ШВЕЙЦАР", "Швейцария"),
-        ("SWITZERLAND", "Швейцария"),
-    ]
-    for needle, country in rules:
-        if needle in s:
-            return country
-    return "Прочие"
+    # Manufacturer names repeat across the registry; the cache is keyed on the
+    # raw text so repeated names skip both uppercasing and the regex scan.
+    return _detect_country_text(manuf_str if isinstance(manuf_str, str) else str(manuf_str))
 
 def _extract_manufacturer(details: dict[str, Any], list_doc: dict[str, Any]) -> tuple[str, Any]:
     for key in ("manufacturers", "manufacturer", "j_manufacturers"):
         val = details.get(key)
         if not val:
             continue
-        parsed = _json_loads_maybe(val)
+        parsed = _coerce_json(val)
         if parsed is not None:
             name = _extract_text(parsed, ("title", "name", "manufacturer", "org_title", "orgTitle"))
             if name:
@@ -110,9 +167,19 @@ def _extract_manufacturer(details: dict[str, Any], list_doc: dict[str, Any]) ->
         return str(list_val).strip(), list_val
     return "", None
 
+_COUNTRY_KEYS = ("country", "countryTitle", "country_name", "countryName")
+
 def _extract_country(source: Any, fallback_name: str) -> str:
+    # FGIS usually sends manufacturers as a list of dicts; read the first one
+    # directly before the general walk below.
+    if type(source) is list and source and type(source[0]) is dict:
+        first = source[0]
+        for key in _COUNTRY_KEYS:
+            val = first.get(key)
+            if val:
+                return str(val).strip()
     if isinstance(source, dict):
-        for key in ("country", "countryTitle", "country_name", "countryName"):
+        for key in _COUNTRY_KEYS:
             val = source.get(key)
             if val:
                 return str(val).strip()
@@ -139,7 +206,7 @@ def _extract_modifications(details: dict[str, Any]) -> str:
         if not val:
             continue
 
-        parsed = _json_loads_maybe(val)
+        parsed = _coerce_json(val)
         source = parsed if parsed is not None else val
         parts: list[str] = []
 
@@ -170,7 +237,7 @@ def _extract_mpi(details: dict[str, Any]) -> str:
         val = details.get(key)
         if not val:
             continue
-        parsed = _json_loads_maybe(val)
+        parsed = _coerce_json(val)
         if parsed is not None:
             text = _extract_text(parsed, ("mpi", "name", "title"))
             if text:
@@ -184,7 +251,7 @@ def _extract_order(details: dict[str, Any]) -> tuple[str, Optional[date]]:
         val = details.get(key)
         if not val:
             continue
-        parsed = _json_loads_maybe(val)
+        parsed = _coerce_json(val)
         if parsed is None:
             parsed = val
         if isinstance(parsed, list) and parsed:
@@ -196,17 +263,44 @@ def _extract_order(details: dict[str, Any]) -> tuple[str, Optional[date]]:
             return order_num, order_date
     return "", None
 
+# FGIS details use either spelling depending on the endpoint version.
+MIT_DETAIL_ALIASES = (
+    ("productionType", "production_type"),
+    ("isActual", "is_actual"),
+    ("validTo", "valid_to"),
+)
+
+def normalize_mit_details(details: dict[str, Any]) -> dict[str, Any]:
+    """Copy camelCase detail fields to their snake_case names in place.
+
+    Idempotent, so `build_mit_row` can apply it to any details it receives and
+    then needs a single lookup per field.
+    """
+    for src, dst in MIT_DETAIL_ALIASES:
+        if not details.get(dst):
+            val = details.get(src)
+            if val:
+                details[dst] = val
+    return details
+
+def _pick_text(details: dict[str, Any], list_doc: dict[str, Any], key: str) -> str:
+    """Return the stripped detail value for `key`, falling back to the list doc."""
+    value = details.get(key) or list_doc.get(key)
+    return value.strip() if value else ""
+
 def build_mit_row(list_doc: dict[str, Any], details: dict[str, Any], inserted_at: datetime) -> Optional[tuple[Any, ...]]:
-    mit_number = (details.get("number") or list_doc.get("number") or "").strip()
+    """Build one mit_registry row from a list doc and raw or normalized details."""
+    details = normalize_mit_details(details)
+    mit_number = _pick_text(details, list_doc, "number")
     if not mit_number:
         return None
     manufacturer, manuf_source = _extract_manufacturer(details, list_doc)
     country = _extract_country(manuf_source, manufacturer)
-    mit_title = (details.get("title") or list_doc.get("title") or "").strip()
-    notation = (details.get("notation") or list_doc.get("notation") or "").strip()
-    production_type = int(details.get("production_type") or details.get("productionType") or 0)
-    is_actual = 1 if details.get("is_actual") or details.get("isActual") else 0
-    valid_to = parse_date_any(details.get("valid_to") or details.get("validTo"))
+    mit_title = _pick_text(details, list_doc, "title")
+    notation = _pick_text(details, list_doc, "notation")
+    production_type = int(details.get("production_type") or 0)
+    is_actual = 1 if details.get("is_actual") else 0
+    valid_to = parse_date_any(details.get("valid_to"))
     mpi = _extract_mpi(details)
     order_num, order_date = _extract_order(details)
     j_mod = _extract_modifications(details)
@@ -228,25 +322,48 @@ def build_mit_row(list_doc: dict[str, Any], details: dict[str, Any], inserted_at
     )
 
 def insert_mit_registry(ch: CH, rows: list[tuple[Any, ...]]) -> None:
-    ch.insert(
-        "mit_registry",
-        [
-            "country",
-            "inserted_at",
-            "is_actual",
-            "manufacturer",
-            "mit_number",
-            "mit_title",
-            "mpi",
-            "notation",
-            "j_modification",
-            "order_date",
-            "order_num",
-            "production_type",
-            "valid_to",
-        ],
-        rows,
-    )
+    """Insert MIT rows as one column-major native block per batch.
+
+    Rows are reduced to the last one per mit_number and sorted by it, the
+    table key, so the block needs no server-side sort and carries no
+    versions that ReplacingMergeTree would drop anyway.
+    """
+    if not rows:
+        return
+    by_number = {row[4]: row for row in rows}
+    rows = [by_number[number] for number in sorted(by_number)]
+    ch.insert("mit_registry", MIT_COLUMNS, [list(column) for column in zip(*rows)], columnar=True)
+
+def _fetch_one_mit_details(client: FGISClient, doc: dict[str, Any], fetch_details: bool) -> dict[str, Any]:
+    mit_uuid = doc.get("mit_uuid")
+    details: dict[str, Any] = {}
+    if fetch_details and mit_uuid:
+        try:
+            details = client.mit_details(mit_uuid)
+        except Exception as exc:
+            log.warning("MIT details failed for %s: %s", mit_uuid, exc)
+    return details
+
+def fetch_mit_details(
+    client: FGISClient,
+    docs: list[dict[str, Any]],
+    fetch_details: bool,
+    workers: int,
+) -> Iterator[tuple[dict[str, Any], dict[str, Any]]]:
+    """Yield `(list_doc, details)` pairs as soon as each detail request finishes.
+
+    Pacing comes from the client's shared token bucket; the pool only overlaps
+    network latency of independent detail requests. Pairs arrive in completion
+    order, so one slow request does not hold back rows that are already built.
+    """
+    if not fetch_details or workers <= 1 or len(docs) <= 1:
+        for doc in docs:
+            yield doc, _fetch_one_mit_details(client, doc, fetch_details)
+        return
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="mit-details") as pool:
+        futures = {pool.submit(_fetch_one_mit_details, client, doc, fetch_details): doc for doc in docs}
+        for future in as_completed(futures):
+            yield futures[future], future.result()
 
 def sync_mit_registry(
     ch: CH,
@@ -257,12 +374,21 @@ def sync_mit_registry(
     stop_on_existing: bool,
     empty_pages_limit: int = 0,
     min_rows: int = 10,
+    details_workers: int = DEFAULT_MIT_DETAILS_WORKERS,
+    stop_existing_ratio: Optional[float] = DEFAULT_MIT_STOP_EXISTING_RATIO,
 ) -> int:
     """Insert missing MIT rows discovered by cursor-scanning the registry.
 
     Existing MIT numbers are skipped before details are requested, so regular
     runs scan the lightweight list endpoint and only pay the details cost for
-    new instruments.
+    new instruments. Details for one page are fetched by a small thread pool.
+    Stored MIT numbers are loaded once per run and kept up to date locally, so
+    pages are filtered without a ClickHouse round trip each.
+
+    With `stop_on_existing`, a positive `empty_pages_limit` and an explicit
+    `stop_existing_ratio`, a page whose share of stored numbers reaches the
+    ratio ends the scan after its missing rows are inserted, instead of
+    paging on into known entries.
     """
     cursor_mark = "*"
     total = 0
@@ -271,11 +397,14 @@ def sync_mit_registry(
     stop_reason = "completed"
     current_rows = max(rows, 1)
     min_rows = max(1, min(min_rows, current_rows))
+    seen = set(ch.distinct_values("mit_registry", "mit_number"))
     log.info(
-        "MIT list: start rows=%s min_rows=%s fetch_details=%s stop_on_existing=%s empty_pages_limit=%s",
+        "MIT list: start known=%s rows=%s min_rows=%s fetch_details=%s details_workers=%s stop_on_existing=%s empty_pages_limit=%s",
+        len(seen),
         current_rows,
         min_rows,
         fetch_details,
+        details_workers,
         stop_on_existing,
         max(empty_pages_limit, 0),
     )
@@ -330,11 +459,10 @@ def sync_mit_registry(
                 stop_reason,
             )
             break
-        numbers = [doc.get("number") for doc in docs if doc.get("number")]
-        existing = ch.existing_ids("mit_registry", "mit_number", numbers) if numbers else set()
-        missing_docs = [doc for doc in docs if doc.get("number") and doc.get("number") not in existing]
-        existing_count = len(existing)
+        numbers = [number for doc in docs if (number := doc.get("number"))]
+        missing_docs = [doc for doc in docs if (number := doc.get("number")) and number not in seen]
         missing_count = len(missing_docs)
+        existing_count = len(numbers) - missing_count
         if missing_count == 0:
             empty_pages_in_row += 1
         else:
@@ -364,31 +492,29 @@ def sync_mit_registry(
             if sleep_s > 0:
                 time.sleep(sleep_s)
             continue
+        # Each page is written as soon as its details arrive: with fetch_details
+        # a page can take minutes, and rows held longer are lost on a hard stop.
         buffer: list[tuple[Any, ...]] = []
-        inserted_now = 0
-        for doc in missing_docs:
-            mit_uuid = doc.get("mit_uuid")
-            details = {}
-            if fetch_details and mit_uuid:
-                try:
-                    details = client.mit_details(mit_uuid)
-                except Exception as exc:
-                    log.warning("MIT details failed for %s: %s", mit_uuid, exc)
-            row = build_mit_row(doc, details, datetime.now())
+        inserted_at = datetime.now()
+        for doc, details in fetch_mit_details(client, missing_docs, fetch_details, details_workers):
+            row = build_mit_row(doc, details, inserted_at)
             if row:
                 buffer.append(row)
-            if len(buffer) >= ch.batch_size:
-                insert_mit_registry(ch, buffer)
-                inserted_now += len(buffer)
-                total += len(buffer)
-                buffer.clear()
-            if sleep_s > 0:
-                time.sleep(sleep_s)
+                seen.add(row[4])
         if buffer:
             insert_mit_registry(ch, buffer)
-            inserted_now += len(buffer)
-            total += len(buffer)
+        inserted_now = len(buffer)
+        total += inserted_now
         log.info("MIT list: page=%s inserted=%s total=%s", page_num, inserted_now, total)
+        if (
+            stop_on_existing
+            and empty_pages_limit > 0
+            and stop_existing_ratio is not None
+            and existing_count >= stop_existing_ratio * len(numbers)
+        ):
+            stop_reason = f"page={page_num}: {existing_count}/{len(numbers)} mit_number already stored"
+            log.info("MIT list: stop_on_existing ratio reached -> stop (%s)", stop_reason)
+            break
         if not next_cursor or next_cursor == cursor_mark:
             stop_reason = f"page={page_num}: cursor exhausted after inserts"
             log.info("MIT list: cursor exhausted -> stop (%s)", stop_reason)
@@ -8,17 +8,15 @@ MIT/VRI modules.
 from __future__ import annotations
 
 import logging
-import os
 from datetime import date, datetime, timedelta
 
 from .clickhouse_io import CH, ensure_tables
-from .dates import parse_ymd
 from .fgis_api import FGISClient
 from .mit_sync import sync_mit_registry
 from .runtime import (
     DAILY_MONTH_DAYS,
     DAILY_MONTH_EVERY,
-    DEFAULT_START_DATE,
+    DEFAULT_VRI_DAY_WORKERS,
     DEFAULT_VRI_ROWS,
     DEFAULT_VRI_SLEEP,
     HALFYEAR_2Y_DAYS,
@@ -30,12 +28,13 @@ from .runtime import (
     PROD_SYNC_HOUR,
     WEEKLY_3M_DAYS,
     WEEKLY_3M_EVERY,
+    SyncConfig,
     acquire_process_lock,
-    env_pick,
     should_run,
     state_get,
     state_get_any,
     state_set,
+    state_set_many,
 )
 from .vri_sync import (
     reconcile_prod_by_year_month,
@@ -69,7 +68,10 @@ def sync_test_mit(ch: CH, client: FGISClient) -> bool:
         empty_pages_limit=0,
         min_rows=10,
     )
-    ch.exec(f"OPTIMIZE TABLE {ch.db}.mit_registry FINAL")
+    # OPTIMIZE FINAL rewrites the whole table; with no new parts there is
+    # nothing to merge, and the prod copy reads test through FINAL anyway.
+    if total:
+        ch.exec(f"OPTIMIZE TABLE {ch.db}.mit_registry FINAL")
     state_set(ch, "test_mit_sync", datetime.now())
     log.info("TEST MIT: done (inserted=%s)", total)
     return True
@@ -83,6 +85,7 @@ def reconcile_test_vri_window(
     days: int,
     label: str,
     state_keys: tuple[str, ...],
+    day_workers: int = DEFAULT_VRI_DAY_WORKERS,
 ) -> bool:
     """Reconcile one rolling VRI window and mark all windows it covers.
 
@@ -91,11 +94,17 @@ def reconcile_test_vri_window(
     """
     start = _window_start(start_date, end_date, days)
     log.info("TEST VRI %s check: %s -> %s", label, start, end_date)
-    ok = reconcile_remote_by_year_month(ch, client, start, end_date, DEFAULT_VRI_ROWS, DEFAULT_VRI_SLEEP)
+    ok = reconcile_remote_by_year_month(
+        ch,
+        client,
+        start,
+        end_date,
+        DEFAULT_VRI_ROWS,
+        DEFAULT_VRI_SLEEP,
+        day_workers=day_workers,
+    )
     if ok:
-        now = datetime.now()
-        for key in state_keys:
-            state_set(ch, key, now)
+        state_set_many(ch, state_keys, datetime.now())
     return ok
 
 def _due_test_vri_scope(ch: CH, now: datetime) -> tuple[str, int, tuple[str, ...]] | None:
@@ -147,7 +156,13 @@ def _due_test_vri_scope(ch: CH, now: datetime) -> tuple[str, int, tuple[str, ...
             return label, days, mark_keys
     return None
 
-def reconcile_due_test_vri(ch: CH, client: FGISClient, start_date: date, end_date: date) -> bool:
+def reconcile_due_test_vri(
+    ch: CH,
+    client: FGISClient,
+    start_date: date,
+    end_date: date,
+    day_workers: int = DEFAULT_VRI_DAY_WORKERS,
+) -> bool:
     """Run the scheduled test-vs-FGIS VRI window that is due now."""
     scope = _due_test_vri_scope(ch, datetime.now())
     if not scope:
@@ -162,20 +177,27 @@ def reconcile_due_test_vri(ch: CH, client: FGISClient, start_date: date, end_dat
         days=days,
         label=label,
         state_keys=state_keys,
+        day_workers=day_workers,
     )
 
 def replace_prod_mit_from_test(ch_test: CH, ch_prod: CH) -> bool:
-    """Publish MIT by replacing prod from deduplicated test data."""
-    source_rows = int(ch_test.scalar(f"SELECT count() FROM {ch_test.db}.mit_registry FINAL") or 0)
-    if source_rows == 0:
+    """Publish MIT by replacing prod from deduplicated test data.
+
+    The copy stays inside ClickHouse. Plain count() only guards against an
+    empty source (it is answered from part metadata); the deduplicated row
+    count is taken from the INSERT itself instead of a separate FINAL scan.
+    """
+    if int(ch_test.scalar(f"SELECT count() FROM {ch_test.db}.mit_registry") or 0) == 0:
         log.warning("PROD MIT: test table is empty -> skip")
         return False
-    log.info("PROD MIT: replace from test (rows=%s)", source_rows)
+    log.info("PROD MIT: replace from test")
     ch_prod.exec(f"TRUNCATE TABLE {ch_prod.db}.mit_registry")
-    ch_prod.exec(
+    source_rows = ch_prod.insert_select(
         f"INSERT INTO {ch_prod.db}.mit_registry "
         f"SELECT * FROM {ch_test.db}.mit_registry FINAL"
     )
+    if source_rows is None:
+        source_rows = int(ch_test.scalar(f"SELECT count() FROM {ch_test.db}.mit_registry FINAL") or 0)
     prod_rows = int(ch_prod.scalar(f"SELECT count() FROM {ch_prod.db}.mit_registry") or 0)
     ok = prod_rows == source_rows
     if ok:
@@ -225,10 +247,7 @@ def sync_prod_from_test(ch_test: CH, ch_prod: CH, start_date: date, end_date: da
     mit_ok = replace_prod_mit_from_test(ch_test, ch_prod)
     vri_ok = reconcile_prod_by_year_month(ch_test, ch_prod, vri_start, end_date, dedup=True)
     if mit_ok and vri_ok:
-        now = datetime.now()
-        state_set(ch_prod, "prod_daily_sync", now)
-        for key in prod_scope_keys:
-            state_set(ch_prod, key, now)
+        state_set_many(ch_prod, ("prod_daily_sync", *prod_scope_keys), datetime.now())
     log.info("PROD sync: done (mit=%s vri=%s)", mit_ok, vri_ok)
     return mit_ok and vri_ok
 
@@ -247,7 +266,14 @@ def maybe_sync_prod(ch_test: CH, ch_prod: CH, start_date: date, upstream_ok: boo
         log.exception("PROD sync: failed")
         return False, True
 
-def run_pipeline(ch_test: CH, ch_prod: CH, client: FGISClient, start_date: date, end_date: date) -> bool:
+def run_pipeline(
+    ch_test: CH,
+    ch_prod: CH,
+    client: FGISClient,
+    start_date: date,
+    end_date: date,
+    day_workers: int = DEFAULT_VRI_DAY_WORKERS,
+) -> bool:
     """Execute one idempotent sync cycle.
 
     systemd starts this script at fixed wall-clock times. The state gates below
@@ -274,7 +300,7 @@ def run_pipeline(ch_test: CH, ch_prod: CH, client: FGISClient, start_date: date,
     # VRI checks are range-first: healthy years/months finish with counts only;
     # mismatching months degrade to day reloads through a staging table.
     try:
-        ok = reconcile_due_test_vri(ch_test, client, start_date, end_date) and ok
+        ok = reconcile_due_test_vri(ch_test, client, start_date, end_date, day_workers) and ok
     except Exception:
         ok = False
         log.exception("TEST VRI reconcile: failed")
@@ -290,27 +316,15 @@ def main() -> None:
         log.info("Another backend_sync.py is already running; exiting.")
         return
 
-    host = env_pick("CH_HOST", default="127.0.0.1")
-    port = int(env_pick("CH_PORT", default="9001"))
-    user = env_pick("CH_USER_INGEST", "CH_USER", "CH_USER_READ", default="default")
-    password = env_pick("CH_PASS_INGEST", "CH_PASS", "CH_PASS_READ", default="")
-    db_test = env_pick("CH_DB_TEST", "CH_DB", default="fgis_test").strip() or "fgis_test"
-    db_prod = env_pick("CH_DB_PROD", default="fgis_prod").strip() or "fgis_prod"
-
-    rps = float(os.getenv("FGIS_RPS", "0.2"))
-    proxy = os.getenv("HTTPS_PROXY") or os.getenv("HTTP_PROXY") or None
-    start_date_env = os.getenv("START_DATE", "").strip()
-    start_date = parse_ymd(start_date_env) if start_date_env else DEFAULT_START_DATE
-    if start_date is None:
-        start_date = DEFAULT_START_DATE
+    config = SyncConfig.from_env()
     end_date = date.today()
 
-    ch_admin = CH(host, port, user, password, "default")
-    ensure_tables(ch_admin, db_test)
-    ensure_tables(ch_admin, db_prod)
-    ch_test = CH(host, port, user, password, db_test)
-    ch_prod = CH(host, port, user, password, db_prod)
+    ch_admin = CH(config.ch_host, config.ch_port, config.ch_user, config.ch_password, "default")
+    ensure_tables(ch_admin, config.db_test)
+    ensure_tables(ch_admin, config.db_prod)
+    ch_test = ch_admin.with_database(config.db_test)
+    ch_prod = ch_admin.with_database(config.db_prod)
 
-    client = FGISClient(proxy=proxy, rps=rps)
-    log.info("Pipeline: start_date=%s end_date=%s rps=%s", start_date, end_date, rps)
-    run_pipeline(ch_test, ch_prod, client, start_date, end_date)
+    client = FGISClient(proxy=config.proxy, rps=config.fgis_rps)
+    log.info("Pipeline: start_date=%s end_date=%s rps=%s", config.start_date, end_date, config.fgis_rps)
+    run_pipeline(ch_test, ch_prod, client, config.start_date, end_date, config.vri_day_workers)
@@ -8,6 +8,7 @@ stored in ClickHouse, and how overlapping processes are prevented.
 from __future__ import annotations
 
 import os
+from dataclasses import dataclass, field
 from datetime import date, datetime, timedelta
 from typing import Iterable, Optional
 
@@ -17,6 +18,7 @@ except ImportError:  # pragma: no cover - deployed target is Linux.
     fcntl = None
 
 from .clickhouse_io import CH
+from .dates import parse_ymd
 
 
 # Data range and page sizes used by the simplified pipeline.
@@ -24,6 +26,15 @@ DEFAULT_START_DATE = date(2010, 1, 1)
 DEFAULT_VRI_ROWS = 9999
 DEFAULT_VRI_SLEEP = 0.0
 DEFAULT_VRI_MIN_ROWS = 10
+# MIT details are independent GETs; a few workers overlap their latency while
+# the shared HttpClient limiter still enforces FGIS_RPS.
+DEFAULT_MIT_DETAILS_WORKERS = 4
+# Opt-in share of stored numbers (e.g. 0.9) at which one page already ends a
+# stop_on_existing scan. None keeps the empty_pages_limit rule alone.
+DEFAULT_MIT_STOP_EXISTING_RATIO: Optional[float] = None
+# Mismatching days of one month are reloaded by this many threads. Each thread
+# uses its own ClickHouse connection; FGIS requests share one RPS limiter.
+DEFAULT_VRI_DAY_WORKERS = 4
 
 # Operational schedule. systemd can start the script several times per day; the
 # gates below choose one VRI safety window per run. Wider windows cover smaller
@@ -49,6 +60,9 @@ MAX_VRI_START_FALLBACK = 9999
 PROCESS_LOCK = "/tmp/fgis_arshin_backend_sync.lock"
 _LOCK_HANDLE = None
 
+# sync_state snapshots by database name, see load_state().
+_STATE_SNAPSHOTS: dict[str, dict[str, datetime]] = {}
+
 
 def env_pick(*names: str, default: str = "") -> str:
     """Return the first non-empty env value from a list of legacy aliases."""
@@ -59,6 +73,39 @@ def env_pick(*names: str, default: str = "") -> str:
     return default
 
 
+@dataclass(frozen=True)
+class SyncConfig:
+    """Environment settings read once at startup and shared read-only."""
+
+    ch_host: str
+    ch_port: int
+    ch_user: str
+    ch_password: str = field(repr=False)
+    db_test: str
+    db_prod: str
+    fgis_rps: float
+    proxy: Optional[str]
+    start_date: date
+    vri_day_workers: int
+
+    @classmethod
+    def from_env(cls) -> "SyncConfig":
+        start_date_env = os.getenv("START_DATE", "").strip()
+        start_date = parse_ymd(start_date_env) if start_date_env else None
+        return cls(
+            ch_host=env_pick("CH_HOST", default="127.0.0.1"),
+            ch_port=int(env_pick("CH_PORT", default="9001")),
+            ch_user=env_pick("CH_USER_INGEST", "CH_USER", "CH_USER_READ", default="default"),
+            ch_password=env_pick("CH_PASS_INGEST", "CH_PASS", "CH_PASS_READ", default=""),
+            db_test=env_pick("CH_DB_TEST", "CH_DB", default="fgis_test").strip() or "fgis_test",
+            db_prod=env_pick("CH_DB_PROD", default="fgis_prod").strip() or "fgis_prod",
+            fgis_rps=float(os.getenv("FGIS_RPS", "0.2")),
+            proxy=os.getenv("HTTPS_PROXY") or os.getenv("HTTP_PROXY") or None,
+            start_date=start_date or DEFAULT_START_DATE,
+            vri_day_workers=max(1, int(os.getenv("VRI_DAY_WORKERS", str(DEFAULT_VRI_DAY_WORKERS)))),
+        )
+
+
 def acquire_process_lock(path: str = PROCESS_LOCK) -> bool:
     """Return False when another backend sync process already owns the lock."""
     global _LOCK_HANDLE
@@ -74,15 +121,33 @@ def acquire_process_lock(path: str = PROCESS_LOCK) -> bool:
     return True
 
 
-def state_get(ch: CH, key: str) -> Optional[datetime]:
-    """Read the latest timestamp for a logical sync checkpoint."""
+def load_state(ch: CH) -> dict[str, datetime]:
+    """Return all checkpoints of a database, read from ClickHouse once per run.
+
+    The schedule asks for many keys on every run; one grouped query replaces a
+    round trip per key. `state_set` keeps the snapshot current. A failed read
+    is not cached, so the next lookup tries again.
+    """
+    snapshot = _STATE_SNAPSHOTS.get(ch.db)
+    if snapshot is not None:
+        return snapshot
     try:
-        value = ch.scalar(f"SELECT max(last_run) FROM {ch.db}.sync_state WHERE key = '{key}'")
+        rows = ch.rows(f"SELECT key, max(last_run) FROM {ch.db}.sync_state GROUP BY key")
     except Exception:
-        return None
-    if isinstance(value, datetime):
-        return value
-    return None
+        return {}
+    snapshot = {key: value for key, value in rows if isinstance(value, datetime)}
+    _STATE_SNAPSHOTS[ch.db] = snapshot
+    return snapshot
+
+
+def reset_state_cache() -> None:
+    """Forget loaded checkpoints, e.g. before a second run in one process."""
+    _STATE_SNAPSHOTS.clear()
+
+
+def state_get(ch: CH, key: str) -> Optional[datetime]:
+    """Read the latest timestamp for a logical sync checkpoint."""
+    return load_state(ch).get(key)
 
 
 def state_get_any(ch: CH, keys: Iterable[str]) -> Optional[datetime]:
@@ -91,9 +156,26 @@ def state_get_any(ch: CH, keys: Iterable[str]) -> Optional[datetime]:
     return max(values) if values else None
 
 
+def state_set_many(ch: CH, keys: Iterable[str], when: datetime) -> None:
+    """Write several checkpoints of one finished phase in a single insert.
+
+    A phase usually completes a scope plus its legacy aliases; one block keeps
+    sync_state at one new part per phase instead of one per key.
+    """
+    keys = list(dict.fromkeys(keys))
+    if not keys:
+        return
+    ch.insert("sync_state", ["key", "last_run"], [(key, when) for key in keys])
+    snapshot = _STATE_SNAPSHOTS.get(ch.db)
+    if snapshot is not None:
+        for key in keys:
+            last = snapshot.get(key)
+            snapshot[key] = when if last is None else max(last, when)
+
+
 def state_set(ch: CH, key: str, when: datetime) -> None:
     """Append a checkpoint row; ReplacingMergeTree keeps the newest version."""
-    ch.insert("sync_state", ["key", "last_run"], [(key, when)])
+    state_set_many(ch, (key,), when)
 
 
 def should_run(ch: CH, key: str, every: timedelta, now: datetime) -> bool:
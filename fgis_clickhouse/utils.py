@@ -2,8 +2,12 @@
 
 from __future__ import annotations
 
+import queue
 import re
-from typing import Any, Iterator, List, Sequence
+import threading
+from typing import Any, Iterable, Iterator, List, Sequence, TypeVar
+
+T = TypeVar("T")
 
 SUB = str.maketrans({"–": "-", "—": "-", "−": "-", " ": ""})
 CONF = {
@@ -52,6 +56,72 @@ def serial_variants(serial: str, max_variants: int = 16) -> List[str]:
 
 
 def chunked(seq: Sequence[Any], size: int) -> Iterator[Sequence[Any]]:
-    """Yield slices of a sequence with the configured size."""
+    """Yield slices of a sequence with the configured size.
+
+    A sequence that already fits is yielded as is, without a copy.
+    """
+    if len(seq) <= size:
+        if seq:
+            yield seq
+        return
     for start in range(0, len(seq), size):
         yield seq[start : start + size]
+
+
+def chunked_columns(columns: Sequence[Sequence[Any]], size: int) -> Iterator[list[Sequence[Any]]]:
+    """Yield aligned slices of column-major data with the configured size.
+
+    Data that already fits is yielded as is, without copying the columns.
+    """
+    total = len(columns[0]) if columns else 0
+    if 0 < total <= size:
+        yield list(columns)
+        return
+    for start in range(0, total, size):
+        yield [column[start : start + size] for column in columns]
+
+
+def prefetch(items: Iterable[T], depth: int = 1) -> Iterator[T]:
+    """Yield items while a background thread already produces the next ones.
+
+    Used to overlap FGIS page downloads with ClickHouse inserts. At most
+    `depth` items wait in the queue; errors of the producer are re-raised in
+    the consumer, and closing the iterator stops the producer.
+    """
+    pending: queue.Queue = queue.Queue(maxsize=max(1, depth))
+    stop = threading.Event()
+    done = object()
+
+    def put(entry: tuple[Any, Any]) -> bool:
+        while not stop.is_set():
+            try:
+                pending.put(entry, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce() -> None:
+        try:
+            for item in items:
+                if not put((item, None)):
+                    close = getattr(items, "close", None)
+                    if close is not None:
+                        close()
+                    return
+        except BaseException as exc:
+            put((done, exc))
+            return
+        put((done, None))
+
+    threading.Thread(target=produce, name="prefetch", daemon=True).start()
+    try:
+        while True:
+            item, exc = pending.get()
+            if item is done:
+                if exc is not None:
+                    raise exc
+                return
+            yield item
+    finally:
+        stop.set()
@@ -3,9 +3,12 @@
 from __future__ import annotations
 
 import logging
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import date, datetime, timedelta
-from typing import Any, Iterator, Optional
+from itertools import count
+from typing import Any, Iterator, Optional, Sequence
 
 from .clickhouse_io import CH
 from .dates import (
@@ -18,17 +21,42 @@ from .fgis_api import FGISClient
 from .runtime import (
     MAX_VRI_START_FALLBACK,
 )
+from .utils import prefetch
 
 
 log = logging.getLogger("fgis_backend")
 
+VRI_RELOAD_TABLE = "verifications_reload_tmp"
+VRI_EPOCH = date(1970, 1, 1)
+# verifications is partitioned by a function of its sort key's date, so equal
+# keys never span partitions: FINAL may dedupe each partition on its own and
+# skip partitions that are already merged into a single part.
+VRI_FINAL_SETTINGS = " SETTINGS do_not_merge_across_partitions_select_final = 1"
+# Closed date-range filter; bind `start`/`end` as query parameters.
+VRI_RANGE_WHERE = "verification_date >= toDate(%(start)s) AND verification_date <= toDate(%(end)s)"
+# FGIS text fields in VRI_COLUMNS order, between inserted_at and valid_date.
+VRI_TEXT_KEYS = ("mi.modification", "mi.number", "mi.mitype", "mi.mitnumber", "mi.mititle", "org_title")
+VRI_COLUMNS = [
+    "applicability",
+    "inserted_at",
+    "mi_modification",
+    "mi_number",
+    "mit_notation",
+    "mit_number",
+    "mit_title",
+    "org_title",
+    "valid_date",
+    "verification_date",
+    "vri_id",
+]
+
 def fq_for_day(d: date) -> str:
-    ds = d.strftime("%Y-%m-%d")
+    ds = d.isoformat()
     return f"verification_date:[{ds}T00:00:00Z TO {ds}T23:59:59Z]"
 
 def fq_for_range(start: date, end: date) -> str:
-    start_s = start.strftime("%Y-%m-%d")
-    end_s = end.strftime("%Y-%m-%d")
+    start_s = start.isoformat()
+    end_s = end.isoformat()
     return f"verification_date:[{start_s}T00:00:00Z TO {end_s}T23:59:59Z]"
 
 def pick_start_date(ch: CH, start_date: Optional[date], tail_days: int) -> Optional[date]:
@@ -62,19 +90,21 @@ def resolve_vri_start_date(ch: CH, start_date: Optional[date], tail_days: int) -
     return pick_start_date(ch, None, tail_days)
 
 def local_vri_stats(ch: CH, d: date) -> tuple[int, int]:
-    ds = d.strftime("%Y-%m-%d")
+    params = {"day": d}
     try:
         rows = int(
             ch.scalar(
                 f"SELECT count() FROM {ch.db}.verifications "
-                f"WHERE verification_date = toDate('{ds}')"
+                f"WHERE verification_date = toDate(%(day)s)",
+                params,
             )
             or 0
         )
         final_rows = int(
             ch.scalar(
                 f"SELECT count() FROM {ch.db}.verifications FINAL "
-                f"WHERE verification_date = toDate('{ds}')"
+                f"WHERE verification_date = toDate(%(day)s)" + VRI_FINAL_SETTINGS,
+                params,
             )
             or 0
         )
@@ -89,16 +119,106 @@ def local_vri_counts_range(ch: CH, start: date, end: date) -> tuple[int, int]:
     keyed by `(verification_date, vri_id)`, so `FINAL` gives the same duplicate
     signal without building a huge hash set in memory.
     """
-    start_s = start.strftime("%Y-%m-%d")
-    end_s = end.strftime("%Y-%m-%d")
+    params = {"start": start, "end": end}
     try:
-        where = f"verification_date >= toDate('{start_s}') AND verification_date <= toDate('{end_s}')"
-        rows = int(ch.scalar(f"SELECT count() FROM {ch.db}.verifications WHERE {where}") or 0)
-        final_rows = int(ch.scalar(f"SELECT count() FROM {ch.db}.verifications FINAL WHERE {where}") or 0)
+        rows = int(ch.scalar(f"SELECT count() FROM {ch.db}.verifications WHERE {VRI_RANGE_WHERE}", params) or 0)
+        final_rows = int(
+            ch.scalar(
+                f"SELECT count() FROM {ch.db}.verifications FINAL WHERE {VRI_RANGE_WHERE}" + VRI_FINAL_SETTINGS,
+                params,
+            )
+            or 0
+        )
         return rows, final_rows
     except Exception:
         return 0, 0
 
+def local_vri_counts_grouped_many(
+    ch: CH,
+    dbs: Sequence[str],
+    start: date,
+    end: date,
+    bucket: str,
+    *,
+    fingerprints: bool = False,
+) -> dict[str, dict[date, tuple[int, int, int]]]:
+    """Return raw and deduplicated bucket counts of several databases at once.
+
+    The raw and FINAL counts of every database are one UNION ALL statement,
+    so comparing test with prod costs a single round trip per level. All
+    databases must live on the server `ch` is connected to. With
+    `fingerprints=True` the third value is the XOR of `cityHash64(vri_id)`
+    over the deduplicated rows, so equal counts with different ids still
+    differ; otherwise it is 0.
+
+    Query errors propagate: reloads skip the DELETE for days counted as
+    empty, so a failed count must never read as zero rows.
+    """
+    params = {"start": start, "end": end}
+    counts: dict[str, dict[date, tuple[int, int, int]]] = {db: {} for db in dbs}
+    parts = []
+    for idx, db in enumerate(dbs):
+        for final in (0, 1):
+            ids = "groupBitXor(cityHash64(vri_id))" if final and fingerprints else "toUInt64(0)"
+            parts.append(
+                f"SELECT {idx} AS src, {final} AS is_final, {bucket} AS bucket, count() AS cnt, {ids} AS ids "
+                f"FROM {db}.verifications{' FINAL' if final else ''} "
+                f"WHERE {VRI_RANGE_WHERE} GROUP BY bucket"
+            )
+    result = ch.rows(" UNION ALL ".join(parts) + VRI_FINAL_SETTINGS, params)
+    for idx, final, bucket_day, rows, ids in result:
+        db_counts = counts[dbs[idx]]
+        raw, dedup, fingerprint = db_counts.get(bucket_day, (0, 0, 0))
+        if final:
+            db_counts[bucket_day] = (raw, int(rows or 0), int(ids or 0))
+        else:
+            db_counts[bucket_day] = (int(rows or 0), dedup, fingerprint)
+    return counts
+
+def local_vri_counts_grouped(ch: CH, start: date, end: date, bucket: str) -> dict[date, tuple[int, int]]:
+    """Return raw and deduplicated counts for every bucket of a VRI range.
+
+    `bucket` is a ClickHouse Date expression such as `verification_date` or
+    `toStartOfMonth(verification_date)`. One grouped query replaces a pair of
+    count queries per year/month/day; missing buckets mean zero rows.
+    """
+    counts = local_vri_counts_grouped_many(ch, (ch.db,), start, end, bucket)[ch.db]
+    return {bucket_day: (raw, dedup) for bucket_day, (raw, dedup, _) in counts.items()}
+
+def remote_vri_day_counts(
+    client: FGISClient,
+    start: date,
+    end: date,
+    expected_total: int,
+) -> Optional[dict[date, int]]:
+    """Fetch per-day remote counts for a range with one facet request.
+
+    Returns None when the facet is unavailable or its buckets do not add up to
+    `expected_total` (the range count), so callers fall back to per-day counts.
+    """
+    if not hasattr(client, "vri_day_counts"):
+        return None
+    try:
+        buckets = client.vri_day_counts(start.isoformat(), end.isoformat())
+    except Exception as exc:
+        log.warning("remote_vri_day_counts: facet failed for %s..%s: %s", start, end, exc)
+        return None
+    counts: dict[date, int] = {}
+    for key, value in buckets.items():
+        day = parse_date_any(key)
+        if day is not None and start <= day <= end and value:
+            counts[day] = counts.get(day, 0) + int(value)
+    if sum(counts.values()) != expected_total:
+        log.warning(
+            "remote_vri_day_counts: facet total %s != range count %s for %s..%s",
+            sum(counts.values()),
+            expected_total,
+            start,
+            end,
+        )
+        return None
+    return counts
+
 def remote_vri_count(client: FGISClient, fq: str) -> int:
     if hasattr(client, "vri_count"):
         try:
@@ -211,22 +331,20 @@ def iter_vri_pages(
             time.sleep(sleep_s)
 
 def delete_vri_day(ch: CH, d: date) -> None:
-    day_str = d.strftime("%Y-%m-%d")
     ch.exec(
         f"ALTER TABLE {ch.db}.verifications "
         f"DELETE WHERE verification_date = toDate(%(day)s) "
         f"SETTINGS mutations_sync=1",
-        {"day": day_str},
+        {"day": d},
     )
 
-def ensure_vri_reload_table(ch: CH) -> str:
+def ensure_vri_reload_table(ch: CH, table: str = VRI_RELOAD_TABLE) -> str:
     """Create a staging table used to make VRI day reloads atomic enough.
 
     FGIS can fail midway through a large day. Loading into a staging table first
     lets us keep the old production/test day intact until the new copy has the
     expected row count.
     """
-    table = "verifications_reload_tmp"
     ch.exec(
         f"CREATE TABLE IF NOT EXISTS {ch.db}.{table} "
         f"AS {ch.db}.verifications "
@@ -241,10 +359,10 @@ def truncate_vri_reload_table(ch: CH, table: str) -> None:
 
 def local_vri_stats_for_table(ch: CH, table: str, d: date) -> tuple[int, int]:
     """Return row and unique-id counts for one day in a specific table."""
-    day_str = d.strftime("%Y-%m-%d")
     rows = ch.rows(
         f"SELECT count(), uniqExact(vri_id) FROM {ch.db}.{table} "
-        f"WHERE verification_date = toDate('{day_str}')"
+        f"WHERE verification_date = toDate(%(day)s)",
+        {"day": d},
     )
     if not rows:
         return 0, 0
@@ -256,9 +374,19 @@ def reload_vri_day_from_remote(
     d: date,
     rows: int,
     sleep_s: float,
+    stage_table: str = VRI_RELOAD_TABLE,
+    remote_rows: Optional[int] = None,
+    local_rows: Optional[int] = None,
 ) -> bool:
-    remote_rows = remote_vri_count(client, fq_for_day(d))
-    stage_table = ensure_vri_reload_table(ch)
+    """Reload one day from FGIS through a staging table.
+
+    `local_rows=0` tells that the day was measured empty locally, so the
+    DELETE mutation (which rewrites the month partition) is skipped. Pass it
+    only from a count that succeeded.
+    """
+    if remote_rows is None:
+        remote_rows = remote_vri_count(client, fq_for_day(d))
+    stage_table = ensure_vri_reload_table(ch, stage_table)
     truncate_vri_reload_table(ch, stage_table)
     try:
         if remote_rows > 0:
@@ -282,14 +410,14 @@ def reload_vri_day_from_remote(
                 remote_rows,
             )
             return False
-        delete_vri_day(ch, d)
+        if local_rows != 0:
+            delete_vri_day(ch, d)
         if remote_rows > 0:
-            day_str = d.strftime("%Y-%m-%d")
             ch.exec(
                 f"INSERT INTO {ch.db}.verifications "
                 f"SELECT * FROM {ch.db}.{stage_table} "
                 f"WHERE verification_date = toDate(%(day)s)",
-                {"day": day_str},
+                {"day": d},
             )
     finally:
         try:
@@ -309,18 +437,63 @@ def reload_vri_day_from_remote(
     )
     return False
 
+def dedupe_vri_day_in_place(ch: CH, d: date, local_uniq: int, stage_table: str = VRI_RELOAD_TABLE) -> bool:
+    """Collapse duplicate versions of one day without downloading it again.
+
+    `verifications` is a ReplacingMergeTree keyed by (verification_date,
+    vri_id), so `FINAL` already yields the newest version of every row. The
+    day is rewritten from that view through the staging table.
+    """
+    day = {"day": d}
+    stage_table = ensure_vri_reload_table(ch, stage_table)
+    truncate_vri_reload_table(ch, stage_table)
+    try:
+        staged = ch.insert_select(
+            f"INSERT INTO {ch.db}.{stage_table} "
+            f"SELECT * FROM {ch.db}.verifications FINAL "
+            f"WHERE verification_date = toDate(%(day)s)" + VRI_FINAL_SETTINGS,
+            day,
+        )
+        if staged is not None and staged != local_uniq:
+            log.warning("REMOTE %s: dedup staged %s rows, expected %s", d, staged, local_uniq)
+            return False
+        delete_vri_day(ch, d)
+        ch.exec(
+            f"INSERT INTO {ch.db}.verifications "
+            f"SELECT * FROM {ch.db}.{stage_table} "
+            f"WHERE verification_date = toDate(%(day)s)",
+            day,
+        )
+    finally:
+        try:
+            truncate_vri_reload_table(ch, stage_table)
+        except Exception:
+            log.exception("REMOTE %s: failed to truncate staging table", d)
+    local_rows, local_uniq_after = local_vri_stats(ch, d)
+    return local_rows == local_uniq_after == local_uniq
+
 def reconcile_day_with_remote(
     ch: CH,
     client: FGISClient,
     d: date,
     rows: int,
     sleep_s: float,
+    stage_table: str = VRI_RELOAD_TABLE,
+    local_stats: Optional[tuple[int, int]] = None,
+    remote_rows: Optional[int] = None,
 ) -> bool:
-    remote_rows = remote_vri_count(client, fq_for_day(d))
-    local_rows, local_uniq = local_vri_stats(ch, d)
+    if remote_rows is None:
+        remote_rows = remote_vri_count(client, fq_for_day(d))
+    local_rows, local_uniq = local_stats if local_stats is not None else local_vri_stats(ch, d)
     if local_rows == local_uniq == remote_rows:
         log.info("REMOTE %s: OK (rows=%s uniq=%s remote=%s)", d, local_rows, local_uniq, remote_rows)
         return True
+    if local_uniq == remote_rows and local_rows > local_uniq:
+        # Every remote row is present; only older versions remain unmerged.
+        log.warning("REMOTE %s: dedup in place (rows=%s uniq=%s remote=%s)", d, local_rows, local_uniq, remote_rows)
+        if dedupe_vri_day_in_place(ch, d, local_uniq, stage_table=stage_table):
+            log.info("REMOTE %s: OK after dedup (rows=%s)", d, local_uniq)
+            return True
     log.warning(
         "REMOTE %s: reload (rows=%s uniq=%s remote=%s)",
         d,
@@ -328,7 +501,92 @@ def reconcile_day_with_remote(
         local_uniq,
         remote_rows,
     )
-    return reload_vri_day_from_remote(ch, client, d, rows, sleep_s)
+    return reload_vri_day_from_remote(
+        ch,
+        client,
+        d,
+        rows,
+        sleep_s,
+        stage_table=stage_table,
+        remote_rows=remote_rows,
+        # local_vri_stats reports (0, 0) on errors, so only prefetched counts
+        # may let the reload skip its DELETE.
+        local_rows=local_rows if local_stats is not None else None,
+    )
+
+def reconcile_days_with_remote(
+    ch: CH,
+    client: FGISClient,
+    days: list[date],
+    rows: int,
+    sleep_s: float,
+    workers: int = 1,
+    local_stats: Optional[dict[date, tuple[int, int]]] = None,
+    remote_counts: Optional[dict[date, int]] = None,
+) -> bool:
+    """Reconcile independent days, optionally on a bounded worker pool.
+
+    The FGIS client is shared, so its limiter still caps the global request
+    rate. Each worker borrows its own pooled ClickHouse connection and uses its
+    own staging table because native connections and staging truncates cannot
+    be shared.
+    `local_stats` and `remote_counts` hold prefetched per-day counts; absent
+    days count as empty.
+    """
+
+    def day_stats(day: date) -> Optional[tuple[int, int]]:
+        if local_stats is None:
+            return None
+        return local_stats.get(day, (0, 0))
+
+    def day_remote(day: date) -> Optional[int]:
+        if remote_counts is None:
+            return None
+        return remote_counts.get(day, 0)
+
+    workers = min(workers, len(days))
+    if workers <= 1:
+        ok = True
+        for day in days:
+            ok = reconcile_day_with_remote(
+                ch,
+                client,
+                day,
+                rows,
+                sleep_s,
+                local_stats=day_stats(day),
+                remote_rows=day_remote(day),
+            ) and ok
+        return ok
+
+    local = threading.local()
+    slot_ids = count(1)
+    borrowed: list[CH] = []
+
+    def run(day: date) -> bool:
+        worker_ch = getattr(local, "ch", None)
+        if worker_ch is None:
+            worker_ch = local.ch = ch.acquire()
+            local.stage_table = f"{VRI_RELOAD_TABLE}_{next(slot_ids)}"
+            borrowed.append(worker_ch)
+        return reconcile_day_with_remote(
+            worker_ch,
+            client,
+            day,
+            rows,
+            sleep_s,
+            stage_table=local.stage_table,
+            local_stats=day_stats(day),
+            remote_rows=day_remote(day),
+        )
+
+    try:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="vri-day") as pool:
+            results = list(pool.map(run, days))
+    finally:
+        for worker_ch in borrowed:
+            ch.release(worker_ch)
+    return all(results)
 
 def reconcile_remote_by_year_month(
     ch: CH,
@@ -337,18 +595,35 @@ def reconcile_remote_by_year_month(
     end: date,
     rows: int,
     sleep_s: float,
+    day_workers: int = 1,
 ) -> bool:
     """Compare local VRI with FGIS using cheap ranges before expensive reloads.
 
     A year-level count catches fully healthy years with one remote request.
     Only mismatching years are split into months, and only mismatching months
     are split into days. This keeps weekly/monthly checks practical on hundreds
-    of millions of rows.
+    of millions of rows. The days of all mismatching months are collected and
+    checked together by `day_workers` threads.
+
+    Remote counts for every level come from one per-day facet of the whole
+    range when FGIS serves it; otherwise each year/month is counted with its
+    own request.
     """
     ok = True
+    remote_days = remote_vri_day_counts(client, start, end, remote_vri_count(client, fq_for_range(start, end)))
+    pending_days: list[date] = []
+    pending_local: dict[date, tuple[int, int]] = {}
+    pending_remote: dict[date, int] = {}
+
+    def remote_count(range_start: date, range_end: date) -> int:
+        if remote_days is None:
+            return remote_vri_count(client, fq_for_range(range_start, range_end))
+        return sum(rows for day, rows in remote_days.items() if range_start <= day <= range_end)
+
+    year_counts = local_vri_counts_grouped(ch, start, end, "toStartOfYear(verification_date)")
     for year_start, year_end in iter_year_ranges(start, end):
-        remote_rows = remote_vri_count(client, fq_for_range(year_start, year_end))
-        local_rows, local_uniq = local_vri_counts_range(ch, year_start, year_end)
+        remote_rows = remote_count(year_start, year_end)
+        local_rows, local_uniq = year_counts.get(date(year_start.year, 1, 1), (0, 0))
         if local_rows == local_uniq == remote_rows:
             log.info(
                 "REMOTE YEAR %s: OK (rows=%s uniq=%s remote=%s)",
@@ -365,10 +640,11 @@ def reconcile_remote_by_year_month(
             local_uniq,
             remote_rows,
         )
+        month_counts = local_vri_counts_grouped(ch, year_start, year_end, "toStartOfMonth(verification_date)")
         for month_start, month_end in iter_month_ranges(year_start, year_end):
-            remote_rows = remote_vri_count(client, fq_for_range(month_start, month_end))
-            local_rows, local_uniq = local_vri_counts_range(ch, month_start, month_end)
-            label = month_start.strftime("%Y-%m")
+            remote_rows = remote_count(month_start, month_end)
+            local_rows, local_uniq = month_counts.get(month_start.replace(day=1), (0, 0))
+            label = month_start.isoformat()[:7]
             if local_rows == local_uniq == remote_rows:
                 log.info(
                     "REMOTE MONTH %s: OK (rows=%s uniq=%s remote=%s)",
@@ -385,25 +661,76 @@ def reconcile_remote_by_year_month(
                 local_uniq,
                 remote_rows,
             )
-            for day in iter_days(month_start, month_end):
-                ok = reconcile_day_with_remote(ch, client, day, rows, sleep_s) and ok
+            days = list(iter_days(month_start, month_end))
+            day_counts = local_vri_counts_grouped(ch, month_start, month_end, "verification_date")
+            if remote_days is not None:
+                remote_month = {day: remote_days.get(day, 0) for day in days}
+            else:
+                remote_month = remote_vri_day_counts(client, month_start, month_end, remote_rows)
+            if remote_month is None:
+                # Without day counts each day is probed remotely on its own.
+                ok = reconcile_days_with_remote(
+                    ch,
+                    client,
+                    days,
+                    rows,
+                    sleep_s,
+                    workers=day_workers,
+                    local_stats=day_counts,
+                ) and ok
+                continue
+            pending_days.extend(days)
+            pending_local.update(day_counts)
+            pending_remote.update(remote_month)
+    if pending_days:
+        ok = reconcile_days_with_remote(
+            ch,
+            client,
+            pending_days,
+            rows,
+            sleep_s,
+            workers=day_workers,
+            local_stats=pending_local,
+            remote_counts=pending_remote,
+        ) and ok
     return ok
 
-def replace_vri_day_from_test(ch_src: CH, ch_dst: CH, d: date, *, dedup: bool) -> None:
-    delete_vri_day(ch_dst, d)
+def replace_vri_day_from_test(
+    ch_src: CH,
+    ch_dst: CH,
+    d: date,
+    *,
+    dedup: bool,
+    dst_rows: Optional[int] = None,
+) -> Optional[int]:
+    """Rewrite one prod day from test and return the copied row count if known.
+
+    The DELETE mutation is skipped when `dst_rows=0` says the day was measured
+    empty; pass it only from a count that succeeded.
+    """
+    if dst_rows != 0:
+        delete_vri_day(ch_dst, d)
     from_clause = f"{ch_src.db}.verifications FINAL" if dedup else f"{ch_src.db}.verifications"
-    day_str = d.strftime("%Y-%m-%d")
-    ch_dst.exec(
+    return ch_dst.insert_select(
         f"INSERT INTO {ch_dst.db}.verifications "
         f"SELECT * FROM {from_clause} "
-        f"WHERE verification_date = toDate(%(day)s)",
-        {"day": day_str},
+        f"WHERE verification_date = toDate(%(day)s)" + (VRI_FINAL_SETTINGS if dedup else ""),
+        {"day": d},
     )
 
-def reconcile_day_with_test(ch_test: CH, ch_prod: CH, d: date, *, dedup: bool) -> bool:
-    test_rows, test_uniq = local_vri_stats(ch_test, d)
-    prod_rows, prod_uniq = local_vri_stats(ch_prod, d)
-    if test_rows == test_uniq and prod_rows == prod_uniq and test_uniq == prod_uniq:
+def reconcile_day_with_test(
+    ch_test: CH,
+    ch_prod: CH,
+    d: date,
+    *,
+    dedup: bool,
+    test_stats: Optional[tuple[int, int]] = None,
+    prod_stats: Optional[tuple[int, int]] = None,
+    ids_match: bool = True,
+) -> bool:
+    test_rows, test_uniq = test_stats if test_stats is not None else local_vri_stats(ch_test, d)
+    prod_rows, prod_uniq = prod_stats if prod_stats is not None else local_vri_stats(ch_prod, d)
+    if ids_match and test_rows == test_uniq and prod_rows == prod_uniq and test_uniq == prod_uniq:
         log.info(
             "PROD %s: OK (test=%s prod=%s)",
             d,
@@ -412,17 +739,22 @@ def reconcile_day_with_test(ch_test: CH, ch_prod: CH, d: date, *, dedup: bool) -
         )
         return True
     log.warning(
-        "PROD %s: reload (test_rows=%s test_uniq=%s prod_rows=%s prod_uniq=%s)",
+        "PROD %s: reload (test_rows=%s test_uniq=%s prod_rows=%s prod_uniq=%s ids_match=%s)",
         d,
         test_rows,
         test_uniq,
         prod_rows,
         prod_uniq,
+        ids_match,
     )
     if test_uniq == 0:
         delete_vri_day(ch_prod, d)
     else:
-        replace_vri_day_from_test(ch_test, ch_prod, d, dedup=dedup)
+        dst_rows = prod_rows if prod_stats is not None else None
+        written = replace_vri_day_from_test(ch_test, ch_prod, d, dedup=dedup, dst_rows=dst_rows)
+        log.info("PROD %s: copied %s rows from test", d, written if written is not None else "?")
+    # Always recount: a copy of the right size can still sit on top of rows
+    # the DELETE did not remove.
     prod_rows, prod_uniq = local_vri_stats(ch_prod, d)
     if prod_rows == prod_uniq == test_uniq:
         log.info("PROD %s: OK after reload (rows=%s uniq=%s)", d, prod_rows, prod_uniq)
@@ -448,15 +780,28 @@ def reconcile_prod_by_year_month(
 
     The function mirrors the remote reconcile strategy: compare broad ranges
     first, then rewrite only mismatching days with DELETE + INSERT from test.
+    Each level reads both sides' counts with one grouped statement on the
+    prod connection, which already reads test for the day copies. Ranges
+    also compare an XOR fingerprint of their vri_ids, so a range whose counts
+    agree but whose rows differ is still descended into.
     """
     ok = True
+    dbs = (ch_test.db, ch_prod.db)
+
+    def grouped(range_start: date, range_end: date, bucket: str):
+        counts = local_vri_counts_grouped_many(ch_prod, dbs, range_start, range_end, bucket, fingerprints=True)
+        return counts[ch_test.db], counts[ch_prod.db]
+
+    test_years, prod_years = grouped(start, end, "toStartOfYear(verification_date)")
     for year_start, year_end in iter_year_ranges(start, end):
-        test_rows, test_uniq = local_vri_counts_range(ch_test, year_start, year_end)
-        prod_rows, prod_uniq = local_vri_counts_range(ch_prod, year_start, year_end)
+        year_key = date(year_start.year, 1, 1)
+        test_rows, test_uniq, test_ids = test_years.get(year_key, (0, 0, 0))
+        prod_rows, prod_uniq, prod_ids = prod_years.get(year_key, (0, 0, 0))
         if (
             test_rows == test_uniq
             and prod_rows == prod_uniq
             and test_uniq == prod_uniq
+            and test_ids == prod_ids
         ):
             log.info(
                 "PROD YEAR %s: OK (test=%s prod=%s)",
@@ -473,14 +818,17 @@ def reconcile_prod_by_year_month(
             prod_rows,
             prod_uniq,
         )
+        test_months, prod_months = grouped(year_start, year_end, "toStartOfMonth(verification_date)")
         for month_start, month_end in iter_month_ranges(year_start, year_end):
-            test_rows, test_uniq = local_vri_counts_range(ch_test, month_start, month_end)
-            prod_rows, prod_uniq = local_vri_counts_range(ch_prod, month_start, month_end)
-            label = month_start.strftime("%Y-%m")
+            month_key = month_start.replace(day=1)
+            test_rows, test_uniq, test_ids = test_months.get(month_key, (0, 0, 0))
+            prod_rows, prod_uniq, prod_ids = prod_months.get(month_key, (0, 0, 0))
+            label = month_start.isoformat()[:7]
             if (
                 test_rows == test_uniq
                 and prod_rows == prod_uniq
                 and test_uniq == prod_uniq
+                and test_ids == prod_ids
             ):
                 log.info(
                     "PROD MONTH %s: OK (test=%s prod=%s)",
@@ -497,48 +845,86 @@ def reconcile_prod_by_year_month(
                 prod_rows,
                 prod_uniq,
             )
+            test_days, prod_days = grouped(month_start, month_end, "verification_date")
             for day in iter_days(month_start, month_end):
-                ok = reconcile_day_with_test(ch_test, ch_prod, day, dedup=dedup) and ok
+                test_rows, test_uniq, test_ids = test_days.get(day, (0, 0, 0))
+                prod_rows, prod_uniq, prod_ids = prod_days.get(day, (0, 0, 0))
+                ok = reconcile_day_with_test(
+                    ch_test,
+                    ch_prod,
+                    day,
+                    dedup=dedup,
+                    test_stats=(test_rows, test_uniq),
+                    prod_stats=(prod_rows, prod_uniq),
+                    ids_match=test_ids == prod_ids,
+                ) and ok
     return ok
 
 def build_vri_row(doc: dict[str, Any], inserted_at: datetime) -> Optional[tuple[Any, ...]]:
     vri_id = (doc.get("vri_id") or "").strip()
     if not vri_id:
         return None
-    verification_date = parse_date_any(doc.get("verification_date")) or date(1970, 1, 1)
-    valid_date = parse_date_any(doc.get("valid_date"))
+    get = doc.get
+    modification, number, mitype, mitnumber, mititle, org_title = [get(key) or "" for key in VRI_TEXT_KEYS]
     return (
-        1 if doc.get("applicability") else 0,
+        1 if get("applicability") else 0,
         inserted_at,
-        doc.get("mi.modification", "") or "",
-        doc.get("mi.number", "") or "",
-        doc.get("mi.mitype", "") or "",
-        doc.get("mi.mitnumber", "") or "",
-        doc.get("mi.mititle", "") or "",
-        doc.get("org_title", "") or "",
-        valid_date,
-        verification_date,
+        modification,
+        number,
+        mitype,
+        mitnumber,
+        mititle,
+        org_title,
+        parse_date_any(get("valid_date")),
+        parse_date_any(get("verification_date")) or VRI_EPOCH,
         vri_id,
     )
 
-def insert_verifications(ch: CH, rows: list[tuple[Any, ...]], table: str = "verifications") -> None:
-    ch.insert(
-        table,
-        [
-            "applicability",
-            "inserted_at",
-            "mi_modification",
-            "mi_number",
-            "mit_notation",
-            "mit_number",
-            "mit_title",
-            "org_title",
-            "valid_date",
-            "verification_date",
-            "vri_id",
-        ],
-        rows,
-    )
+def _parse_date_column(values: list[Any]) -> list[Optional[date]]:
+    """Parse a page's date column, converting each distinct raw value once.
+
+    A VRI day page shares one verification_date and few valid_date values, so
+    this turns per-row parsing into a dict lookup.
+    """
+    try:
+        parsed = {value: parse_date_any(value) for value in set(values)}
+    except TypeError:
+        return [parse_date_any(value) for value in values]
+    return [parsed[value] for value in values]
+
+def build_vri_columns(docs: list[dict[str, Any]], inserted_at: datetime) -> list[list[Any]]:
+    """Build VRI insert data for a whole FGIS page column by column.
+
+    Columns follow `VRI_COLUMNS`. Each column is extracted in one pass over the
+    page, which keeps per-row Python work small on days with tens of thousands
+    of documents, and the result can be sent to ClickHouse without a transpose.
+    """
+    kept: list[dict[str, Any]] = []
+    vri_ids: list[str] = []
+    for doc in docs:
+        vri_id = (doc.get("vri_id") or "").strip()
+        if vri_id:
+            kept.append(doc)
+            vri_ids.append(vri_id)
+
+    epoch = VRI_EPOCH
+    return [
+        [1 if doc.get("applicability") else 0 for doc in kept],
+        [inserted_at] * len(kept),
+        *([doc.get(key) or "" for doc in kept] for key in VRI_TEXT_KEYS),
+        _parse_date_column([doc.get("valid_date") for doc in kept]),
+        [value or epoch for value in _parse_date_column([doc.get("verification_date") for doc in kept])],
+        vri_ids,
+    ]
+
+def insert_verifications(
+    ch: CH,
+    rows: list[Any],
+    table: str = "verifications",
+    *,
+    columnar: bool = False,
+) -> None:
+    ch.insert(table, VRI_COLUMNS, rows, columnar=columnar)
 
 def sync_vri_day(
     ch: CH,
@@ -551,41 +937,75 @@ def sync_vri_day(
     min_rows: Optional[int] = None,
     table: str = "verifications",
 ) -> int:
-    """Load one VRI day into ClickHouse, optionally skipping already seen IDs."""
+    """Load one VRI day into ClickHouse, optionally skipping already seen IDs.
+
+    With `skip_existing`, the day's stored ids are read once and pages are
+    filtered against them locally. Pages are buffered by vri_id (last copy
+    wins; a copy arriving after a flush is written again as the newer version)
+    and written in blocks of about `ch.batch_size` rows, sorted like the
+    table key. The result counts each vri_id once.
+    """
     total = 0
-    for docs, num_found, page_num, page_rows, page_mode in iter_vri_pages(
-        client,
-        d,
-        rows,
-        sleep_s,
-        min_rows=min_rows,
-    ):
-        if remote_total is None:
-            remote_total = num_found
-        docs_to_insert = docs
-        if skip_existing:
-            ids = [doc.get("vri_id") for doc in docs if doc.get("vri_id")]
-            existing = ch.existing_ids_for_date("verifications", "vri_id", ids, date_col="verification_date", day=d)
-            if existing:
-                docs_to_insert = [doc for doc in docs if doc.get("vri_id") and doc["vri_id"] not in existing]
-        rows_to_insert = []
-        inserted_at = datetime.now()
-        for doc in docs_to_insert:
-            row = build_vri_row(doc, inserted_at)
-            if row:
-                rows_to_insert.append(row)
-        if rows_to_insert:
-            insert_verifications(ch, rows_to_insert, table=table)
-            total += len(rows_to_insert)
-        log.info(
-            "%s: page=%s mode=%s docs=%s rows=%s +%s (loaded=%s / remote=%s)",
-            d,
-            page_num,
-            page_mode,
-            len(docs),
-            page_rows,
-            len(rows_to_insert),
-            total,
-            remote_total if remote_total is not None else num_found,
-        )
+    seen: Optional[set[str]] = None
+    # Ids taken from FGIS in this call, kept across flushes so `total` counts
+    # each vri_id once; `seen` holds only the ids stored before the call.
+    loaded: set[str] = set()
+    buffer: dict[str, dict[str, Any]] = {}
+
+    def flush(block: dict[str, dict[str, Any]]) -> None:
+        # One verification_date per day, so vri_id order is the ORDER BY order.
+        docs = [block[vri_id] for vri_id in sorted(block)]
+        insert_verifications(ch, build_vri_columns(docs, datetime.now()), table=table, columnar=True)
+
+    # The next FGIS page downloads while the current one is built and inserted.
+    pages = prefetch(iter_vri_pages(client, d, rows, sleep_s, min_rows=min_rows))
+    try:
+        for docs, num_found, page_num, page_rows, page_mode in pages:
+            if remote_total is None:
+                remote_total = num_found
+            if skip_existing and seen is None:
+                seen = ch.distinct_values(
+                    "verifications",
+                    "vri_id",
+                    "verification_date = toDate(%(day)s)",
+                    {"day": d},
+                )
+            inserted = 0
+            for doc in docs:
+                # Stored ids are stripped by build_vri_columns; compare the same form.
+                vri_id = (doc.get("vri_id") or "").strip()
+                if not vri_id or (seen and vri_id in seen):
+                    continue
+                if vri_id not in loaded:
+                    inserted += 1
+                    loaded.add(vri_id)
+                buffer[vri_id] = doc
+            if inserted:
+                total += inserted
+                if len(buffer) >= ch.batch_size:
+                    block, buffer = buffer, {}
+                    flush(block)
+            log.info(
+                "%s: page=%s mode=%s docs=%s rows=%s +%s (loaded=%s / remote=%s)",
+                d,
+                page_num,
+                page_mode,
+                len(docs),
+                page_rows,
+                inserted,
+                total,
+                remote_total if remote_total is not None else num_found,
+            )
+    except BaseException:
+        pages.close()
+        if buffer:
+            try:
+                flush(buffer)
+            except Exception as flush_exc:
+                # Re-raise the page error below; a failed flush only loses this block.
+                log.error("%s: flush after failure dropped %s rows: %s", d, len(buffer), flush_exc)
+        raise
+    pages.close()
+    if buffer:
+        flush(buffer)
     return total
@@ -0,0 +1,95 @@
+from __future__ import annotations
+
+import sys
+import types
+import unittest
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from fgis_clickhouse.clickhouse_io import CH, ensure_tables
+
+
+class _SchemaCH:
+    def __init__(self, tables: list[str], column_types: list[tuple[str, str]]) -> None:
+        self.db = "fgis_test"
+        self.tables = tables
+        self.column_types = column_types
+        self.statements: list[str] = []
+
+    def rows(self, sql: str, params: dict | None = None):
+        self.statements.append(sql)
+        if "system.tables" in sql:
+            return [(name,) for name in self.tables]
+        return list(self.column_types)
+
+    def exec(self, sql: str, params: dict | None = None) -> None:
+        self.statements.append(sql)
+
+
+class EnsureTablesTests(unittest.TestCase):
+    def test_existing_schema_costs_two_catalog_reads(self) -> None:
+        ch = _SchemaCH(["mit_registry", "verifications", "sync_state"], [("country", "LowCardinality(String)")])
+        ensure_tables(ch)
+
+        self.assertEqual(len(ch.statements), 2)
+        self.assertFalse(any("CREATE" in sql for sql in ch.statements))
+
+    def test_missing_tables_are_created_and_old_columns_migrated(self) -> None:
+        ch = _SchemaCH(["mit_registry"], [("country", "String"), ("notation", "LowCardinality(String)")])
+        ensure_tables(ch)
+
+        created = [sql for sql in ch.statements if "CREATE" in sql]
+        self.assertEqual(len(created), 2)
+        self.assertTrue(any("fgis_test.verifications" in sql for sql in created))
+        altered = [sql for sql in ch.statements if sql.startswith("ALTER")]
+        self.assertEqual(altered, ["ALTER TABLE fgis_test.mit_registry MODIFY COLUMN country LowCardinality(String)"])
+
+
+class InsertSelectTests(unittest.TestCase):
+    def _ch(self, written_rows: int) -> CH:
+        ch = CH.__new__(CH)
+        progress = SimpleNamespace(written_rows=written_rows)
+        client = SimpleNamespace(execute=lambda *args: [], last_query=SimpleNamespace(progress=progress))
+        ch._shared = SimpleNamespace(client=client)
+        return ch
+
+    def test_written_rows_come_from_progress(self) -> None:
+        self.assertEqual(self._ch(12).insert_select("INSERT INTO t SELECT 1"), 12)
+
+    def test_zero_progress_is_unknown(self) -> None:
+        self.assertIsNone(self._ch(0).insert_select("INSERT INTO t SELECT 1"))
+
+
+class _FakeNative:
+    def __init__(self, **kwargs) -> None:
+        self.kwargs = kwargs
+        self.connected = True
+
+    def disconnect(self) -> None:
+        self.connected = False
+
+
+class WithDatabaseTests(unittest.TestCase):
+    def setUp(self) -> None:
+        driver = types.ModuleType("clickhouse_driver")
+        driver.Client = _FakeNative
+        with patch.dict(sys.modules, {"clickhouse_driver": driver}):
+            self.admin = CH("127.0.0.1", 9000, "default", "", "default")
+        self.test = self.admin.with_database("fgis_test")
+        self.prod = self.admin.with_database("fgis_prod")
+
+    def test_reconnect_moves_every_handle_to_the_new_session(self) -> None:
+        old = self.admin._client
+        self.prod.reconnect()
+
+        self.assertFalse(old.connected)
+        self.assertIsNot(self.prod._client, old)
+        self.assertIs(self.test._client, self.prod._client)
+        self.assertIs(self.admin._client, self.prod._client)
+
+    def test_only_the_owning_handle_disconnects_the_session(self) -> None:
+        self.test.close()
+        self.assertTrue(self.admin._client.connected)
+
+        self.admin.close()
+        self.assertFalse(self.prod._client.connected)
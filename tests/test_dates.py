@@ -0,0 +1,39 @@
+from __future__ import annotations
+
+import unittest
+from datetime import date, datetime
+
+from fgis_clickhouse.dates import parse_date_any, parse_ymd
+
+
+class DateParsingTests(unittest.TestCase):
+    def test_parse_date_any_accepts_fgis_formats(self) -> None:
+        self.assertEqual(parse_date_any("2026-04-03"), date(2026, 4, 3))
+        self.assertEqual(parse_date_any("2026-04-03T00:00:00Z"), date(2026, 4, 3))
+        self.assertEqual(parse_date_any(" 03.04.2026 "), date(2026, 4, 3))
+        self.assertEqual(parse_date_any("3.4.2026"), date(2026, 4, 3))
+        self.assertEqual(parse_date_any("2026-04-03T10:15:00.000Z"), date(2026, 4, 3))
+        self.assertEqual(parse_date_any(datetime(2026, 4, 3, 12, 30)), date(2026, 4, 3))
+        self.assertEqual(parse_date_any("2026-4-3T10:15:00Z"), date(2026, 4, 3))
+        self.assertEqual(parse_date_any("2026-4-3Z"), date(2026, 4, 3))
+
+    def test_parse_date_any_rejects_invalid_text(self) -> None:
+        self.assertIsNone(parse_date_any("2026-13-01"))
+        self.assertIsNone(parse_date_any("31.02.2026"))
+        self.assertIsNone(parse_date_any("not a date"))
+        self.assertIsNone(parse_date_any(""))
+        self.assertIsNone(parse_date_any(None))
+
+    def test_parse_ymd_keeps_strptime_leniency(self) -> None:
+        self.assertEqual(parse_ymd("2010-01-01"), date(2010, 1, 1))
+        self.assertEqual(parse_ymd("2010-1-1"), date(2010, 1, 1))
+        self.assertIsNone(parse_ymd("01.01.2010"))
+
+    def test_iso_slices_must_be_digits(self) -> None:
+        for text in ("2026-+4-03", "20_6-04-03", "2026- 4-03", "2026-04-+3"):
+            self.assertIsNone(parse_ymd(text), text)
+            self.assertIsNone(parse_date_any(text), text)
+
+    def test_dotted_slices_must_be_digits(self) -> None:
+        for text in ("03.04.20_6", "+3.04.2026", "03. 4.2026"):
+            self.assertIsNone(parse_date_any(text), text)
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import json
 import sys
 import types
 import unittest
@@ -29,6 +30,7 @@ class _FakeResponse:
         self.status_code = status_code
         self._payload = payload or {}
         self.headers = headers or {}
+        self.content = json.dumps(self._payload).encode()
 
     def json(self) -> dict:
         return self._payload
@@ -40,6 +42,7 @@ class _FakeResponse:
 class _FakeSession:
     def __init__(self, responses: list[_FakeResponse]) -> None:
         self._responses = list(responses)
+        self.headers: dict[str, str] = {}
 
     def get(self, url: str, headers: dict, timeout: int, proxies: dict | None):
         return self._responses.pop(0)
@@ -72,7 +75,7 @@ class HttpClientTests(unittest.TestCase):
             client = HttpClient(proxy=None, rps=5.0)
 
         sleep_calls: list[float] = []
-        monotonic_values = iter([1.0, 1.0, 8.0, 8.0])
+        monotonic_values = iter([1.0, 1.0, 1.0])
 
         with patch("fgis_clickhouse.http_client.time.monotonic", side_effect=lambda: next(monotonic_values)):
             with patch("fgis_clickhouse.http_client.time.sleep", side_effect=lambda seconds: sleep_calls.append(seconds)):
@@ -80,3 +83,76 @@ class HttpClientTests(unittest.TestCase):
 
         self.assertEqual(payload, {"response": {"docs": []}})
         self.assertEqual(sleep_calls, [7.0])
+
+    def test_token_bucket_allows_configured_burst(self) -> None:
+        with patch.dict("os.environ", {"HTTP_BURST": "3"}):
+            with patch("fgis_clickhouse.http_client.requests.Session", return_value=_FakeSession([])):
+                client = HttpClient(proxy=None, rps=1.0)
+
+        sleep_calls: list[float] = []
+
+        with patch("fgis_clickhouse.http_client.time.monotonic", return_value=50.0):
+            with patch("fgis_clickhouse.http_client.time.sleep", side_effect=lambda seconds: sleep_calls.append(seconds)):
+                for _ in range(4):
+                    client._wait_for_slot()
+
+        self.assertEqual(sleep_calls, [1.0])
+
+    def test_retry_after_pauses_every_thread_sharing_the_bucket(self) -> None:
+        with patch("fgis_clickhouse.http_client.requests.Session", return_value=_FakeSession([])):
+            client = HttpClient(proxy=None, rps=5.0)
+
+        sleep_calls: list[float] = []
+        monotonic_values = iter([20.0, 20.0, 21.0, 30.0])
+
+        with patch("fgis_clickhouse.http_client.time.monotonic", side_effect=lambda: next(monotonic_values)):
+            with patch("fgis_clickhouse.http_client.time.sleep", side_effect=lambda seconds: sleep_calls.append(seconds)):
+                client._wait_for_slot()
+                client._bucket.defer(10.0)
+                client._wait_for_slot()
+                client._wait_for_slot()
+
+        self.assertEqual(sleep_calls, [9.0, 0.2])
+
+    def test_overlapping_retry_after_pauses_do_not_add_up(self) -> None:
+        with patch("fgis_clickhouse.http_client.requests.Session", return_value=_FakeSession([])):
+            client = HttpClient(proxy=None, rps=5.0)
+
+        sleep_calls: list[float] = []
+        monotonic_values = iter([20.0, 20.0, 21.0, 22.0])
+
+        with patch("fgis_clickhouse.http_client.time.monotonic", side_effect=lambda: next(monotonic_values)):
+            with patch("fgis_clickhouse.http_client.time.sleep", side_effect=lambda seconds: sleep_calls.append(seconds)):
+                client._wait_for_slot()
+                client._bucket.defer(30.0)
+                client._bucket.defer(30.0)
+                client._wait_for_slot()
+
+        self.assertEqual(sleep_calls, [29.0])
+
+    def test_retry_after_during_a_wait_is_honored_after_waking(self) -> None:
+        with patch("fgis_clickhouse.http_client.requests.Session", return_value=_FakeSession([])):
+            client = HttpClient(proxy=None, rps=1.0)
+
+        sleep_calls: list[float] = []
+        monotonic_values = iter([5.0, 5.0, 5.0, 6.0])
+
+        def sleep(seconds: float) -> None:
+            sleep_calls.append(seconds)
+            if len(sleep_calls) == 1:
+                client._bucket.defer(10.0)  # Another thread got a 429 meanwhile.
+
+        with patch("fgis_clickhouse.http_client.time.monotonic", side_effect=lambda: next(monotonic_values)):
+            with patch("fgis_clickhouse.http_client.time.sleep", side_effect=sleep):
+                client._wait_for_slot()
+                client._wait_for_slot()
+
+        self.assertEqual(sleep_calls, [1.0, 9.0])
+
+    def test_static_headers_are_set_once_on_the_session(self) -> None:
+        session = _FakeSession([])
+        with patch("fgis_clickhouse.http_client.requests.Session", return_value=session):
+            HttpClient(proxy=None, rps=1.0)
+
+        self.assertEqual(session.headers["Connection"], "keep-alive")
+        self.assertIn("Referer", session.headers)
@@ -0,0 +1,267 @@
+from __future__ import annotations
+
+import sys
+import types
+import unittest
+from datetime import date, datetime
+from urllib.parse import quote
+
+
+requests_stub = types.ModuleType("requests")
+requests_utils_stub = types.ModuleType("requests.utils")
+requests_utils_stub.quote = quote
+
+
+class _DummySession:
+    pass
+
+
+requests_stub.Session = _DummySession
+requests_stub.utils = requests_utils_stub
+sys.modules.setdefault("requests", requests_stub)
+sys.modules.setdefault("requests.utils", requests_utils_stub)
+
+from fgis_clickhouse.mit_sync import (
+    COUNTRY_RULES,
+    _extract_country,
+    _extract_text,
+    build_mit_row,
+    detect_country,
+    fetch_mit_details,
+    insert_mit_registry,
+    normalize_mit_details,
+    sync_mit_registry,
+)
+
+
+def _detect_country_reference(manuf_str: str) -> str:
+    if not manuf_str:
+        return "Не указано"
+    s = str(manuf_str).upper()
+    for needle, country in COUNTRY_RULES:
+        if needle in s:
+            return country
+    return "Прочие"
+
+
+class DetectCountryTests(unittest.TestCase):
+    def test_rule_order_wins_over_match_position(self) -> None:
+        self.assertEqual(detect_country("Acme GmbH, China"), "Китай")
+        self.assertEqual(detect_country("ООО Прибор, Россия"), "Россия")
+        self.assertEqual(detect_country("Keysight, United States"), "США")
+
+    def test_matches_sequential_rule_scan(self) -> None:
+        samples = [
+            "",
+            "Fluke Corporation, USA",
+            "Testo SE & Co. KGaA, Germany",
+            "Rohde & Schwarz GmbH & Co. KG",
+            "Hioki E.E. Corporation, Japan",
+            "Megger Ltd, UK",
+            "Tektronix Taiwan / USA",
+            "ТОО Казахстан Прибор",
+            "Neutral Instruments",
+        ]
+        for sample in samples:
+            with self.subTest(sample=sample):
+                self.assertEqual(detect_country(sample), _detect_country_reference(sample))
+
+
+class FetchMitDetailsTests(unittest.TestCase):
+    def test_pool_pairs_each_doc_with_its_details_and_tolerates_failures(self) -> None:
+        class FakeClient:
+            def mit_details(self, mit_uuid: str) -> dict[str, str]:
+                if mit_uuid == "bad":
+                    raise RuntimeError("HTTP 500")
+                return {"number": mit_uuid}
+
+        docs = [{"mit_uuid": str(idx)} for idx in range(20)] + [{"mit_uuid": "bad"}, {}]
+        pairs = list(fetch_mit_details(FakeClient(), docs, True, workers=4))
+
+        self.assertEqual(len(pairs), len(docs))
+        for doc, details in pairs:
+            if doc.get("mit_uuid", "bad") == "bad":
+                self.assertEqual(details, {})
+            else:
+                self.assertEqual(details, {"number": doc["mit_uuid"]})
+
+
+class BuildMitRowTests(unittest.TestCase):
+    def test_camel_case_details_are_normalized_once(self) -> None:
+        details = normalize_mit_details(
+            {"number": " 100-01 ", "productionType": "2", "isActual": True, "validTo": "2030-01-31", "is_actual": 0}
+        )
+
+        row = build_mit_row({}, details, datetime(2026, 1, 1))
+
+        self.assertEqual(details["production_type"], "2")
+        self.assertEqual(row[4], "100-01")
+        self.assertEqual((row[2], row[11], row[12]), (1, 2, date(2030, 1, 31)))
+
+    def test_raw_camel_case_details_are_accepted(self) -> None:
+        row = build_mit_row({}, {"number": "100-01", "productionType": "2", "isActual": True}, datetime(2026, 1, 1))
+
+        self.assertEqual((row[2], row[11]), (1, 2))
+
+    def test_insert_block_is_sorted_and_keeps_last_row_per_number(self) -> None:
+        class CaptureCH:
+            def __init__(self) -> None:
+                self.columns: list[list] = []
+
+            def insert(self, table: str, columns: list[str], rows: list, *, columnar: bool = False) -> None:
+                self.columns = rows
+
+        when = datetime(2026, 1, 1)
+        rows = [
+            build_mit_row({}, normalize_mit_details({"number": number, "manufacturer": maker}), when)
+            for number, maker in (("300-01", "A"), ("100-01", "B"), ("300-01", "C"))
+        ]
+        ch = CaptureCH()
+        insert_mit_registry(ch, rows)
+
+        self.assertEqual(ch.columns[4], ["100-01", "300-01"])
+        self.assertEqual(ch.columns[3], ["B", "C"])
+
+
+class ExtractCountryTests(unittest.TestCase):
+    def test_manufacturer_list_shapes(self) -> None:
+        self.assertEqual(_extract_country([{"countryTitle": " Германия "}], "x"), "Германия")
+        self.assertEqual(_extract_country([{"countryName": "Китай"}, {"country": "Япония"}], "x"), "Китай")
+        self.assertEqual(_extract_country({"country": "Япония"}, "x"), "Япония")
+        self.assertEqual(_extract_country([], ""), "Не указано")
+        self.assertEqual(_extract_country(None, "ООО Ромашка"), detect_country("ООО Ромашка"))
+
+
+class ExtractTextTests(unittest.TestCase):
+    def test_nested_lists_are_searched_in_document_order(self) -> None:
+        keys = ("title", "name")
+        payload = [[], [{"other": 1}, ["  ", {"code": " first "}]], {"title": "second"}]
+
+        self.assertEqual(_extract_text(payload, keys), "first")
+        self.assertEqual(_extract_text([{"title": 7}, "x"], keys), "7")
+        self.assertEqual(_extract_text({"nested": {"title": "x"}}, keys), "")
+        self.assertEqual(_extract_text(None, keys), "")
+
+    def test_blank_key_value_moves_on_to_next_item(self) -> None:
+        keys = ("title", "name")
+
+        self.assertEqual(_extract_text([{"title": "  "}, {"title": "Acme"}], keys), "Acme")
+        self.assertEqual(_extract_text([{"title": "  ", "name": "skip"}, "next"], keys), "next")
+
+
+class SyncMitRegistryTests(unittest.TestCase):
+    def test_skips_stored_and_already_inserted_numbers(self) -> None:
+        class FakeCH:
+            batch_size = 100
+
+            def __init__(self) -> None:
+                self.rows: list[tuple] = []
+                self.distinct_calls = 0
+
+            def distinct_values(self, table: str, column: str, where: str = "") -> set[str]:
+                self.distinct_calls += 1
+                return {"100-01"}
+
+            def insert(self, table: str, columns: list[str], rows: list, *, columnar: bool = False) -> None:
+                self.rows.extend(zip(*rows) if columnar else rows)
+
+        pages = {
+            "*": ([{"number": "100-01"}, {"number": "100-02", "mit_uuid": "u2"}], "c1"),
+            "c1": ([{"number": "100-02", "mit_uuid": "u2"}, {"number": "100-03", "mit_uuid": "u3"}], "c2"),
+            "c2": ([], "c2"),
+        }
+
+        class FakeClient:
+            def mit_list_cursor(self, *, cursor_mark: str, rows: int):
+                return pages[cursor_mark]
+
+            def mit_details(self, mit_uuid: str) -> dict[str, str]:
+                return {"title": f"title {mit_uuid}"}
+
+        ch = FakeCH()
+        total = sync_mit_registry(ch, FakeClient(), rows=2, sleep_s=0.0, fetch_details=True, stop_on_existing=False)
+
+        self.assertEqual(total, 2)
+        self.assertEqual([row[4] for row in ch.rows], ["100-02", "100-03"])
+        self.assertEqual(ch.distinct_calls, 1)
+
+    def test_each_page_is_written_before_the_next_fetch(self) -> None:
+        class FakeCH:
+            batch_size = 65536
+
+            def __init__(self) -> None:
+                self.rows: list[tuple] = []
+
+            def distinct_values(self, table: str, column: str, where: str = "") -> set[str]:
+                return set()
+
+            def insert(self, table: str, columns: list[str], rows: list, *, columnar: bool = False) -> None:
+                self.rows.extend(zip(*rows) if columnar else rows)
+
+        class FailingClient:
+            def mit_list_cursor(self, *, cursor_mark: str, rows: int):
+                if cursor_mark == "*":
+                    return [{"number": "100-01"}], "c1"
+                raise ValueError("page error")
+
+        ch = FakeCH()
+        with self.assertRaisesRegex(RuntimeError, "page error"):
+            sync_mit_registry(
+                ch,
+                FailingClient(),
+                rows=1,
+                sleep_s=0.0,
+                fetch_details=False,
+                stop_on_existing=False,
+                min_rows=1,
+            )
+
+        self.assertEqual([row[4] for row in ch.rows], ["100-01"])
+
+    def test_stop_on_existing_ends_scan_on_mostly_stored_page(self) -> None:
+        class FakeCH:
+            batch_size = 100
+
+            def __init__(self) -> None:
+                self.rows: list[tuple] = []
+
+            def distinct_values(self, table: str, column: str, where: str = "") -> set[str]:
+                return {f"200-{idx:02d}" for idx in range(9)}
+
+            def insert(self, table: str, columns: list[str], rows: list, *, columnar: bool = False) -> None:
+                self.rows.extend(zip(*rows) if columnar else rows)
+
+        class FakeClient:
+            def __init__(self) -> None:
+                self.cursors: list[str] = []
+
+            def mit_list_cursor(self, *, cursor_mark: str, rows: int):
+                self.cursors.append(cursor_mark)
+                return [{"number": f"200-{idx:02d}"} for idx in range(10)], "c1"
+
+            def mit_details(self, mit_uuid: str) -> dict[str, str]:
+                return {}
+
+        ch = FakeCH()
+        client = FakeClient()
+        total = sync_mit_registry(
+            ch,
+            client,
+            rows=10,
+            sleep_s=0.0,
+            fetch_details=False,
+            stop_on_existing=True,
+            empty_pages_limit=3,
+            stop_existing_ratio=0.9,
+        )
+
+        self.assertEqual(total, 1)
+        self.assertEqual([row[4] for row in ch.rows], ["200-09"])
+        self.assertEqual(client.cursors, ["*"])
+
+        # Without an explicit ratio the scan pages on as before.
+        client = FakeClient()
+        sync_mit_registry(
+            FakeCH(), client, rows=10, sleep_s=0.0, fetch_details=False, stop_on_existing=True, empty_pages_limit=3
+        )
+        self.assertEqual(client.cursors, ["*", "c1"])
@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+import unittest
+from datetime import datetime
+
+from fgis_clickhouse import runtime
+
+
+class _StateCH:
+    def __init__(self, db: str, rows: list[tuple[str, datetime]]) -> None:
+        self.db = db
+        self._rows = rows
+        self.queries = 0
+        self.inserted: list[tuple[str, datetime]] = []
+
+    def rows(self, sql: str):
+        self.queries += 1
+        return list(self._rows)
+
+    def insert(self, table: str, columns: list[str], rows: list[tuple[str, datetime]]) -> None:
+        self.inserted.extend(rows)
+
+
+class SyncStateTests(unittest.TestCase):
+    def setUp(self) -> None:
+        runtime.reset_state_cache()
+        self.addCleanup(runtime.reset_state_cache)
+
+    def test_state_is_loaded_once_and_updated_locally(self) -> None:
+        old = datetime(2026, 4, 1, 5, 0)
+        ch = _StateCH("fgis_test", [("test_mit_sync", old)])
+
+        self.assertEqual(runtime.state_get(ch, "test_mit_sync"), old)
+        self.assertIsNone(runtime.state_get(ch, "test_daily_month"))
+
+        new = datetime(2026, 4, 2, 5, 0)
+        runtime.state_set(ch, "test_mit_sync", new)
+        runtime.state_set(ch, "test_mit_sync", old)
+
+        self.assertEqual(runtime.state_get_any(ch, ["test_mit_sync", "test_daily_month"]), new)
+        self.assertEqual(ch.queries, 1)
+        self.assertEqual(ch.inserted, [("test_mit_sync", new), ("test_mit_sync", old)])
+
+    def test_phase_checkpoints_share_one_insert(self) -> None:
+        when = datetime(2026, 4, 2, 5, 0)
+        ch = _StateCH("fgis_test", [])
+        inserts: list[list[tuple[str, datetime]]] = []
+        ch.insert = lambda table, columns, rows: inserts.append(rows)
+        self.assertIsNone(runtime.state_get(ch, "legacy_daily"))
+
+        runtime.state_set_many(ch, ["test_daily_month", "test_daily_month", "legacy_daily"], when)
+        runtime.state_set_many(ch, [], when)
+
+        self.assertEqual(inserts, [[("test_daily_month", when), ("legacy_daily", when)]])
+        self.assertEqual(runtime.state_get(ch, "legacy_daily"), when)
+
+    def test_snapshots_are_kept_per_database(self) -> None:
+        when = datetime(2026, 4, 1, 21, 0)
+        test_ch = _StateCH("fgis_test", [])
+        prod_ch = _StateCH("fgis_prod", [("prod_daily_sync", when)])
+
+        self.assertIsNone(runtime.state_get(test_ch, "prod_daily_sync"))
+        self.assertEqual(runtime.state_get(prod_ch, "prod_daily_sync"), when)
@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+import threading
+import unittest
+
+from fgis_clickhouse.utils import chunked, chunked_columns, prefetch
+
+
+class PrefetchTests(unittest.TestCase):
+    def test_yields_items_in_order_from_another_thread(self) -> None:
+        producers: list[str] = []
+
+        def produce():
+            for idx in range(5):
+                producers.append(threading.current_thread().name)
+                yield idx
+
+        self.assertEqual(list(prefetch(produce(), depth=2)), [0, 1, 2, 3, 4])
+        self.assertEqual(set(producers), {"prefetch"})
+
+    def test_producer_errors_reach_the_consumer(self) -> None:
+        def produce():
+            yield 1
+            raise RuntimeError("HTTP 500")
+
+        pages = prefetch(produce())
+        self.assertEqual(next(pages), 1)
+        with self.assertRaisesRegex(RuntimeError, "HTTP 500"):
+            next(pages)
+
+    def test_closing_stops_the_producer(self) -> None:
+        finished = threading.Event()
+
+        def produce():
+            try:
+                idx = 0
+                while True:
+                    yield idx
+                    idx += 1
+            finally:
+                finished.set()
+
+        pages = prefetch(produce())
+        self.assertEqual(next(pages), 0)
+        pages.close()
+        self.assertTrue(finished.wait(2.0))
+
+
+class ChunkedColumnsTests(unittest.TestCase):
+    def test_slices_stay_aligned(self) -> None:
+        columns = [[1, 2, 3], ["a", "b", "c"]]
+
+        self.assertEqual(list(chunked_columns(columns, 2)), [[[1, 2], ["a", "b"]], [[3], ["c"]]])
+
+    def test_block_that_fits_is_not_copied(self) -> None:
+        columns = [[1, 2, 3], ["a", "b", "c"]]
+        rows = [(1, "a"), (2, "b")]
+
+        (block,) = chunked_columns(columns, 3)
+        self.assertIs(block[0], columns[0])
+        (chunk,) = chunked(rows, 2)
+        self.assertIs(chunk, rows)
+        self.assertEqual(list(chunked([], 2)), [])
@@ -3,7 +3,8 @@ from __future__ import annotations
 import sys
 import types
 import unittest
-from datetime import date
+from datetime import date, datetime
+from unittest.mock import patch
 from urllib.parse import quote
 
 
@@ -44,11 +45,13 @@ def _doc(vri_id: str) -> dict[str, str]:
 
 
 class _FakeCH:
+    batch_size = 65536
+
     def __init__(self) -> None:
         self.rows: list[tuple[object, ...]] = []
 
-    def insert(self, table: str, columns: list[str], rows: list[tuple[object, ...]]) -> None:
-        self.rows.extend(rows)
+    def insert(self, table: str, columns: list[str], rows: list, *, columnar: bool = False) -> None:
+        self.rows.extend(zip(*rows) if columnar else rows)
 
     def scalar(self, sql: str):
         return date(2026, 4, 16)
@@ -96,6 +99,91 @@ class CursorFallbackTests(unittest.TestCase):
         self.assertEqual([row[-1] for row in ch.rows], ["1", "2", "3", "4"])
         self.assertEqual(client.page_calls, [(2, 4)])
 
+    def test_sync_vri_day_buffers_pages_into_batch_sized_blocks(self) -> None:
+        docs = [_doc(str(idx)) for idx in range(1, 6)]
+
+        class PagedClient:
+            def vri_cursor(self, *, fq: str | None, rows: int, cursor_mark: str, sort: str = "vri_id asc"):
+                start = 0 if cursor_mark == "*" else int(cursor_mark)
+                return docs[start : start + rows], len(docs), str(start + rows)
+
+        class BlockCH(_FakeCH):
+            batch_size = 4
+
+            def __init__(self) -> None:
+                super().__init__()
+                self.blocks: list[int] = []
+
+            def insert(self, table: str, columns: list[str], rows: list, *, columnar: bool = False) -> None:
+                self.blocks.append(len(rows[-1]))
+                super().insert(table, columns, rows, columnar=columnar)
+
+        ch = BlockCH()
+        total = backend_sync.sync_vri_day(ch, PagedClient(), date(2026, 4, 3), rows=2, sleep_s=0.0, skip_existing=False)
+
+        self.assertEqual(total, 5)
+        self.assertEqual(ch.blocks, [4, 1])
+        self.assertEqual([row[-1] for row in ch.rows], ["1", "2", "3", "4", "5"])
+
+    def test_sync_vri_day_sorts_and_dedupes_block_across_pages(self) -> None:
+        repeated = _doc("2")
+        repeated["mi.number"] = "newer"
+        docs = [_doc("3"), _doc("2"), {"vri_id": " "}, _doc("1"), repeated]
+
+        class PagedClient:
+            def vri_cursor(self, *, fq: str | None, rows: int, cursor_mark: str, sort: str = "vri_id asc"):
+                start = 0 if cursor_mark == "*" else int(cursor_mark)
+                return docs[start : start + rows], len(docs), str(start + rows)
+
+        ch = _FakeCH()
+        total = backend_sync.sync_vri_day(ch, PagedClient(), date(2026, 4, 3), rows=2, sleep_s=0.0, skip_existing=False)
+
+        self.assertEqual(total, 3)
+        self.assertEqual([row[-1] for row in ch.rows], ["1", "2", "3"])
+        self.assertEqual(ch.rows[1][3], "newer")
+
+    def test_sync_vri_day_normalizes_ids_before_skip_and_count(self) -> None:
+        def doc(vri_id: str, number: str) -> dict[str, str]:
+            return {**_doc(vri_id), "mi.number": number}
+
+        pages = [[doc(" 1 ", "a"), doc("2", "b")], [doc("2 ", "c"), doc("3", "d")], [doc("2", "e")]]
+
+        class PagedClient:
+            def vri_cursor(self, *, fq: str | None, rows: int, cursor_mark: str, sort: str = "vri_id asc"):
+                idx = 0 if cursor_mark == "*" else int(cursor_mark)
+                return (pages[idx] if idx < len(pages) else []), 6, str(idx + 1)
+
+        class StoredCH(_FakeCH):
+            batch_size = 2
+
+            def distinct_values(self, table: str, column: str, where: str = "", params: dict | None = None) -> set[str]:
+                return {"1"}
+
+        ch = StoredCH()
+        total = backend_sync.sync_vri_day(ch, PagedClient(), date(2026, 4, 3), rows=2, sleep_s=0.0, skip_existing=True)
+
+        self.assertEqual(total, 2)
+        self.assertEqual([(row[-1], row[3]) for row in ch.rows], [("2", "c"), ("3", "d"), ("2", "e")])
+
+    def test_sync_vri_day_failed_flush_keeps_page_error(self) -> None:
+        class FailingClient:
+            def vri_cursor(self, *, fq: str | None, rows: int, cursor_mark: str, sort: str = "vri_id asc"):
+                if cursor_mark == "*":
+                    return [_doc("1")], 3, "c1"
+                raise RuntimeError("HTTP 500")
+
+            def vri_page(self, *, fq: str | None, rows: int, start: int):
+                raise ValueError("page error")
+
+        class BrokenCH(_FakeCH):
+            def insert(self, table: str, columns: list[str], rows: list, *, columnar: bool = False) -> None:
+                raise ConnectionError("ClickHouse down")
+
+        with self.assertRaisesRegex(ValueError, "page error"):
+            backend_sync.sync_vri_day(
+                BrokenCH(), FailingClient(), date(2026, 4, 3), rows=1, sleep_s=0.0, skip_existing=False
+            )
+
     def test_iter_vri_pages_keeps_rows_fixed_after_switch_to_start(self) -> None:
         docs = [_doc("1"), _doc("2"), _doc("3"), _doc("4")]
 
@@ -154,3 +242,322 @@ class CursorFallbackTests(unittest.TestCase):
         next(pages)
         with self.assertRaisesRegex(RuntimeError, r"start fallback is unavailable beyond start=9999"):
             next(pages)
+
+
+class BuildVriPageTests(unittest.TestCase):
+    def test_build_vri_columns_match_row_builder(self) -> None:
+        inserted_at = datetime(2026, 4, 16, 12, 0)
+        docs = [
+            _doc("1"),
+            {**_doc("2"), "applicability": False, "mi.number": None, "valid_date": None},
+            {"vri_id": "3"},
+            {**_doc(" "), "org_title": "skip"},
+        ]
+
+        expected = [row for doc in docs if (row := backend_sync.build_vri_row(doc, inserted_at))]
+
+        self.assertEqual(list(zip(*backend_sync.build_vri_columns(docs, inserted_at))), expected)
+
+    def test_day_filters_use_zero_padded_dates(self) -> None:
+        self.assertEqual(
+            backend_sync.fq_for_day(date(2024, 3, 5)),
+            "verification_date:[2024-03-05T00:00:00Z TO 2024-03-05T23:59:59Z]",
+        )
+        self.assertEqual(
+            backend_sync.fq_for_range(date(2024, 1, 1), date(2024, 1, 31)),
+            "verification_date:[2024-01-01T00:00:00Z TO 2024-01-31T23:59:59Z]",
+        )
+
+
+class ReconcileDaysTests(unittest.TestCase):
+    def test_parallel_days_use_own_connections_and_staging_tables(self) -> None:
+        class PooledCH(_FakeCH):
+            def __init__(self) -> None:
+                super().__init__()
+                self.clones: list[PooledCH] = []
+                self.idle: list[PooledCH] = []
+
+            def acquire(self) -> "PooledCH":
+                if self.idle:
+                    return self.idle.pop()
+                clone = PooledCH()
+                self.clones.append(clone)
+                return clone
+
+            def release(self, conn: "PooledCH") -> None:
+                self.idle.append(conn)
+
+        calls: list[tuple[object, date, str]] = []
+
+        def fake_reconcile(
+            ch,
+            client,
+            day,
+            rows,
+            sleep_s,
+            stage_table="verifications_reload_tmp",
+            local_stats=None,
+            remote_rows=None,
+        ):
+            calls.append((ch, day, stage_table))
+            return day != date(2026, 4, 2)
+
+        root = PooledCH()
+        days = [date(2026, 4, day) for day in range(1, 7)]
+        with patch("fgis_clickhouse.vri_sync.reconcile_day_with_remote", side_effect=fake_reconcile):
+            ok = backend_sync.reconcile_days_with_remote(root, object(), days, 10, 0.0, workers=3)
+            backend_sync.reconcile_days_with_remote(root, object(), days, 10, 0.0, workers=3)
+
+        self.assertFalse(ok)
+        self.assertEqual(sorted(day for _ch, day, _table in calls[: len(days)]), days)
+        self.assertNotIn(root, [ch for ch, _day, _table in calls])
+        self.assertLessEqual(len(root.clones), 3)
+        self.assertEqual(sorted(map(id, root.idle)), sorted(map(id, root.clones)))
+        self.assertTrue(all(table.startswith("verifications_reload_tmp_") for _ch, _day, table in calls))
+
+    def test_remote_day_counts_come_from_one_facet_request(self) -> None:
+        class FacetClient:
+            def __init__(self) -> None:
+                self.calls: list[tuple[str, str]] = []
+
+            def vri_day_counts(self, start_iso: str, end_iso: str) -> dict[str, int]:
+                self.calls.append((start_iso, end_iso))
+                return {"2026-04-01T00:00:00Z": 3, "2026-04-02T00:00:00Z": 0, "2026-04-03T00:00:00Z": 2}
+
+        client = FacetClient()
+        counts = backend_sync.remote_vri_day_counts(client, date(2026, 4, 1), date(2026, 4, 30), 5)
+
+        self.assertEqual(counts, {date(2026, 4, 1): 3, date(2026, 4, 3): 2})
+        self.assertEqual(client.calls, [("2026-04-01", "2026-04-30")])
+        self.assertIsNone(backend_sync.remote_vri_day_counts(client, date(2026, 4, 1), date(2026, 4, 30), 6))
+        self.assertIsNone(backend_sync.remote_vri_day_counts(object(), date(2026, 4, 1), date(2026, 4, 30), 5))
+
+    def test_duplicate_only_day_is_deduplicated_without_refetch(self) -> None:
+        class DedupCH:
+            db = "test"
+
+            def __init__(self) -> None:
+                self.statements: list[str] = []
+
+            def exec(self, sql: str, params: dict | None = None) -> None:
+                self.statements.append(sql)
+
+            def insert_select(self, sql: str, params: dict | None = None) -> int:
+                self.statements.append(sql)
+                return 5
+
+            def scalar(self, sql: str, params: dict | None = None) -> int:
+                return 5
+
+        ch = DedupCH()
+        with patch("fgis_clickhouse.vri_sync.reload_vri_day_from_remote") as reload:
+            ok = backend_sync.reconcile_day_with_remote(
+                ch, object(), date(2026, 4, 3), 10, 0.0, local_stats=(7, 5), remote_rows=5
+            )
+
+        self.assertTrue(ok)
+        reload.assert_not_called()
+        self.assertTrue(any("FROM test.verifications FINAL" in sql for sql in ch.statements))
+        self.assertTrue(any("DELETE" in sql for sql in ch.statements))
+
+    def test_remote_reconcile_counts_all_levels_from_one_facet(self) -> None:
+        class FacetClient:
+            def __init__(self) -> None:
+                self.calls: list[str] = []
+
+            def vri_count(self, fq: str) -> int:
+                self.calls.append(fq)
+                return 5
+
+            def vri_day_counts(self, start_iso: str, end_iso: str) -> dict[str, int]:
+                self.calls.append(f"facet {start_iso}..{end_iso}")
+                return {"2025-12-31T00:00:00Z": 2, "2026-02-03T00:00:00Z": 3}
+
+        class GroupedCH:
+            db = "test"
+
+            def rows(self, sql: str, params: dict | None = None):
+                if "toStartOfYear" in sql:
+                    buckets = [(date(2025, 1, 1), 2), (date(2026, 1, 1), 3)]
+                elif "toStartOfMonth" in sql:
+                    buckets = [(date(2026, 2, 1), 3)]
+                else:
+                    buckets = [(date(2026, 2, 3), 3)]
+                return [(0, final, bucket, rows, 0) for final in (0, 1) for bucket, rows in buckets]
+
+        client = FacetClient()
+        ok = backend_sync.reconcile_remote_by_year_month(
+            GroupedCH(), client, date(2025, 12, 1), date(2026, 3, 31), 10, 0.0
+        )
+
+        self.assertTrue(ok)
+        self.assertEqual(
+            client.calls,
+            [backend_sync.fq_for_range(date(2025, 12, 1), date(2026, 3, 31)), "facet 2025-12-01..2026-03-31"],
+        )
+
+    def test_remote_reconcile_checks_days_of_all_months_in_one_pool(self) -> None:
+        class FacetClient:
+            def vri_count(self, fq: str) -> int:
+                return 5
+
+            def vri_day_counts(self, start_iso: str, end_iso: str) -> dict[str, int]:
+                return {"2026-01-10T00:00:00Z": 2, "2026-02-03T00:00:00Z": 3}
+
+        class EmptyCH:
+            db = "test"
+
+            def rows(self, sql: str, params: dict | None = None):
+                return []
+
+        with patch("fgis_clickhouse.vri_sync.reconcile_days_with_remote", return_value=True) as days_check:
+            ok = backend_sync.reconcile_remote_by_year_month(
+                EmptyCH(), FacetClient(), date(2026, 1, 1), date(2026, 3, 31), 10, 0.0, day_workers=4
+            )
+
+        self.assertTrue(ok)
+        self.assertEqual(days_check.call_count, 1)
+        days = days_check.call_args.args[2]
+        self.assertEqual((days[0], days[-1], len(days)), (date(2026, 1, 1), date(2026, 2, 28), 59))
+        self.assertEqual(days_check.call_args.kwargs["remote_counts"][date(2026, 2, 3)], 3)
+
+
+class ReconcileDayWithTestTests(unittest.TestCase):
+    def test_reload_is_recounted_and_empty_days_skip_delete(self) -> None:
+        class CountingCH:
+            def __init__(self, db: str, count: int, written: int | None = None) -> None:
+                self.db = db
+                self.count = count
+                self.written = written
+                self.scalar_calls = 0
+                self.statements: list[str] = []
+
+            def scalar(self, sql: str, params: dict | None = None) -> int:
+                self.scalar_calls += 1
+                return self.count
+
+            def exec(self, sql: str, params: dict | None = None) -> None:
+                self.statements.append(sql)
+                if "DELETE" in sql:
+                    self.count = 0
+
+            def insert_select(self, sql: str, params: dict | None = None) -> int | None:
+                self.statements.append(sql)
+                self.count += self.written or 0
+                return self.written
+
+        ch_test = CountingCH("test", 5)
+        ch_prod = CountingCH("prod", 3, written=5)
+
+        ok = backend_sync.reconcile_day_with_test(ch_test, ch_prod, date(2026, 4, 3), dedup=True)
+
+        self.assertTrue(ok)
+        self.assertEqual(ch_prod.scalar_calls, 4)
+        self.assertEqual(len(ch_prod.statements), 2)
+        self.assertIn("FROM test.verifications FINAL", ch_prod.statements[1])
+
+        empty_prod = CountingCH("prod", 0, written=5)
+        self.assertTrue(
+            backend_sync.reconcile_day_with_test(
+                ch_test, empty_prod, date(2026, 4, 4), dedup=True, test_stats=(5, 5), prod_stats=(0, 0)
+            )
+        )
+        self.assertEqual(len(empty_prod.statements), 1)
+        self.assertNotIn("DELETE", empty_prod.statements[0])
+
+        # A zero from local_vri_stats may be a swallowed error: still DELETE.
+        unknown_prod = CountingCH("prod", 0, written=5)
+        backend_sync.reconcile_day_with_test(ch_test, unknown_prod, date(2026, 4, 5), dedup=True)
+        self.assertIn("DELETE", unknown_prod.statements[0])
+
+    def test_copy_on_top_of_stale_rows_is_caught_by_recount(self) -> None:
+        class StaleCH:
+            db = "prod"
+
+            def __init__(self) -> None:
+                self.count = 5
+
+            def scalar(self, sql: str, params: dict | None = None) -> int:
+                return self.count
+
+            def insert_select(self, sql: str, params: dict | None = None) -> int:
+                self.count += 5
+                return 5
+
+        ch_test = StaleCH()
+        ch_test.db = "test"
+        ok = backend_sync.reconcile_day_with_test(
+            ch_test, StaleCH(), date(2026, 4, 3), dedup=True, test_stats=(5, 5), prod_stats=(0, 0)
+        )
+
+        self.assertFalse(ok)
+
+    def test_failed_grouped_count_is_not_read_as_empty(self) -> None:
+        class BrokenCH:
+            db = "test"
+
+            def rows(self, sql: str, params: dict | None = None):
+                raise RuntimeError("timeout")
+
+        with self.assertRaises(RuntimeError):
+            backend_sync.local_vri_counts_grouped(BrokenCH(), date(2026, 4, 1), date(2026, 4, 30), "verification_date")
+
+    def test_prod_reconcile_reads_grouped_counts(self) -> None:
+        class GroupedCH:
+            def __init__(self, db: str) -> None:
+                self.db = db
+                self.queries: list[str] = []
+
+            def rows(self, sql: str, params: dict | None = None):
+                self.queries.append(sql)
+                if "toStartOfYear" in sql:
+                    bucket = date(2026, 1, 1)
+                elif "toStartOfMonth" in sql:
+                    bucket = date(2026, 2, 1)
+                else:
+                    bucket = date(2026, 2, 3)
+                return [(src, final, bucket, 10 - src, 0) for src in (0, 1) for final in (0, 1)]
+
+        ch_test, ch_prod = GroupedCH("test"), GroupedCH("prod")
+        with patch("fgis_clickhouse.vri_sync.reconcile_day_with_test", return_value=True) as day_check:
+            ok = backend_sync.reconcile_prod_by_year_month(
+                ch_test, ch_prod, date(2026, 2, 1), date(2026, 2, 28), dedup=True
+            )
+
+        self.assertTrue(ok)
+        self.assertEqual(ch_test.queries, [])
+        self.assertEqual(len(ch_prod.queries), 3)
+        self.assertIn("FROM test.verifications FINAL", ch_prod.queries[0])
+        self.assertEqual(day_check.call_count, 28)
+        stats = {call.args[2]: call.kwargs["prod_stats"] for call in day_check.call_args_list}
+        self.assertEqual(stats[date(2026, 2, 3)], (9, 9))
+        self.assertEqual(stats[date(2026, 2, 4)], (0, 0))
+
+    def test_prod_reconcile_descends_when_only_ids_differ(self) -> None:
+        class GroupedCH:
+            def __init__(self, db: str) -> None:
+                self.db = db
+                self.queries: list[str] = []
+
+            def rows(self, sql: str, params: dict | None = None):
+                self.queries.append(sql)
+                if "toStartOfYear" in sql:
+                    bucket = date(2026, 1, 1)
+                elif "toStartOfMonth" in sql:
+                    bucket = date(2026, 2, 1)
+                else:
+                    bucket = date(2026, 2, 3)
+                return [(src, final, bucket, 10, (0x5A + src) * final) for src in (0, 1) for final in (0, 1)]
+
+        ch_test, ch_prod = GroupedCH("test"), GroupedCH("prod")
+        with patch("fgis_clickhouse.vri_sync.reconcile_day_with_test", return_value=True) as day_check:
+            ok = backend_sync.reconcile_prod_by_year_month(
+                ch_test, ch_prod, date(2026, 2, 1), date(2026, 2, 28), dedup=True
+            )
+
+        self.assertTrue(ok)
+        self.assertEqual(len(ch_prod.queries), 3)
+        self.assertIn("groupBitXor(cityHash64(vri_id))", ch_prod.queries[0])
+        ids_match = {call.args[2]: call.kwargs["ids_match"] for call in day_check.call_args_list}
+        self.assertFalse(ids_match[date(2026, 2, 3)])
+        self.assertTrue(ids_match[date(2026, 2, 4)])